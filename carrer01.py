@@ -1,9 +1,17 @@
 import os
+import re
+import csv
+import io
+import tempfile
+import numpy as np
 import streamlit as st
 import openai
 from duckduckgo_search import DDGS  # pip install duckduckgo-search
 import json # Not strictly needed for this version, but useful for structured data handling
 
+from exporter import EXPORT_FORMATS, ExportDocument, ExportEngine
+from resume_template import get_engine as get_resume_engine, render_resume
+
 # ==================== 설정 방법 ====================
 # 1) 환경변수 사용 시:
 #    터미널에서:
@@ -63,86 +71,118 @@ with st.form(key="detailed_resume_form"):
     submitted = st.form_submit_button("이력서 및 자기소개서 생성 & 평판 조회")
 
 # 인터넷 평판 조회 함수
-def fetch_reputation(name: str, max_results: int = 5):
+REPUTATION_MAX_RESULTS = 50
+REPUTATION_QUERY_TERMS = ("문제", "논란", "성과", "논문")  # 검색어에 OR로 붙이는 용어
+COVER_LETTER_TIMEOUT = 60  # 자기소개서 생성 최대 대기 시간(초)
+
+@st.cache_resource
+def get_cover_letter_client(api_key):
+    """자기소개서 생성 전용 클라이언트. 기본 재시도(2회)를 끄고 타임아웃을 걸어 전체 대기 시간이 제한을 넘지 않도록 함"""
+    return openai.OpenAI(api_key=api_key, timeout=COVER_LETTER_TIMEOUT, max_retries=0)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def search_reputation(query: str, max_results: int):
+    """DuckDuckGo 검색 결과 (같은 질의는 1시간 동안 재사용)"""
+    reputations = []
+    with DDGS() as ddgs:
+        # timelimit을 사용하면 너무 최근 결과만 나올 수 있어, 없애거나 필요에 따라 조정
+        results = ddgs.text(query, region='wt-wt', safesearch='Off', max_results=max_results)
+        for i, r in enumerate(results):
+            if i >= max_results:
+                break
+            snippet = r.get('body', '')
+            url = r.get('href', '')
+            reputations.append({'snippet': snippet, 'url': url})
+    return reputations
+
+def fetch_reputation(name: str, max_results: int = REPUTATION_MAX_RESULTS):
     """DuckDuckGo Search를 사용하여 특정 이름의 평판을 조회합니다."""
     if not name:
         return []
     # 평판 조회 쿼리 강화: 긍정적/부정적 키워드 포함
-    query = f'"{name}" 평판 후기 OR 리뷰 OR "문제" OR "논란" OR "성과" OR "논문"'
-    reputations = []
+    query = f'"{name}" 평판 후기 OR 리뷰 OR ' + " OR ".join(f'"{term}"' for term in REPUTATION_QUERY_TERMS)
     try:
-        with DDGS() as ddgs:
-            # timelimit을 사용하면 너무 최근 결과만 나올 수 있어, 없애거나 필요에 따라 조정
-            results = ddgs.text(query, region='wt-wt', safesearch='Off', max_results=max_results)
-            for i, r in enumerate(results):
-                if i >= max_results:
-                    break
-                snippet = r.get('body', '')
-                url = r.get('href', '')
-                reputations.append({'snippet': snippet, 'url': url})
-        return reputations
+        return search_reputation(query, max_results)
     except Exception as e:
         st.error(f"평판 조회 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요. 오류: {e}")
         return []
 
-# 이력서 텍스트 생성 함수 (GPT를 사용하지 않고 직접 포맷팅)
-def generate_resume_text(data):
-    """입력된 이력서 데이터를 Markdown 형식의 텍스트로 변환합니다."""
-    resume_parts = []
-
-    resume_parts.append("## 📄 이 력 서\n")
-    resume_parts.append("### 👤 개인 정보\n")
-    resume_parts.append(f"- **이름**: {data['name']}")
-    resume_parts.append(f"- **전화번호**: {data['cellphone']}")
-    resume_parts.append(f"- **이메일**: {data['email']}")
-    if data['address']:
-        resume_parts.append(f"- **주소**: {data['address']}")
-    resume_parts.append("\n")
-
-    if data['education']:
-        resume_parts.append("### 🎓 학력\n")
-        # 학력은 사용자가 입력한 그대로 표시
-        resume_parts.append(data['education'] + "\n")
-        resume_parts.append("\n")
-
-    if data['experience']:
-        resume_parts.append("### 🏢 경력\n")
-        # 경력은 사용자가 입력한 그대로 표시
-        resume_parts.append(data['experience'] + "\n")
-        resume_parts.append("\n")
-
-    if data['skills']:
-        resume_parts.append("### 💡 기술 및 역량\n")
-        # 기술 및 역량은 사용자가 입력한 그대로 표시
-        resume_parts.append(data['skills'] + "\n")
-        resume_parts.append("\n")
-
-    if data['certification']:
-        resume_parts.append("### 📜 자격증\n")
-        resume_parts.append(data['certification'] + "\n")
-        resume_parts.append("\n")
-
-    if data['language']:
-        resume_parts.append("### 🗣️ 어학 능력\n")
-        resume_parts.append(data['language'] + "\n")
-        resume_parts.append("\n")
-
-    if data['awards']:
-        resume_parts.append("### 🏆 수상 경력\n")
-        resume_parts.append(data['awards'] + "\n")
-        resume_parts.append("\n")
-
-    if data['activities']:
-        resume_parts.append("### 🌍 대외 활동\n")
-        resume_parts.append(data['activities'] + "\n")
-        resume_parts.append("\n")
-
-    if data['portfolio_link']:
-        resume_parts.append("### 🔗 포트폴리오\n")
-        resume_parts.append(f"- [포트폴리오 링크]({data['portfolio_link']})\n")
-        resume_parts.append("\n")
-
-    return "\n".join(resume_parts)
+# 평판 스니펫 로컬 점수화 (관련성 + 긍/부정) — 외부 호출 없이 한 번에 행렬 연산
+# 검색어로 넣은 용어는 결과 대부분에 들어 있어 극성을 왜곡하므로 사전에서 제외
+POSITIVE_TERMS = [term for term in ["수상", "성과", "우수", "선정", "혁신", "기여", "성공", "인정", "표창", "최우수",
+                                    "호평", "추천", "감사", "발표", "논문", "특허", "합격", "모범", "신뢰", "칭찬"]
+                  if term not in REPUTATION_QUERY_TERMS]
+NEGATIVE_TERMS = [term for term in ["논란", "문제", "비판", "고소", "고발", "사기", "횡령", "징계", "의혹", "실패",
+                                    "폭로", "불만", "갑질", "구속", "기소", "비리", "해고", "피해", "물의", "사과"]
+                  if term not in REPUTATION_QUERY_TERMS]
+INSTITUTION_SUFFIXES = ("대학교", "대학", "고등학교", "대학원", "주식회사", "그룹", "전자", "은행", "연구소",
+                        "연구원", "재단", "병원", "공사", "회사", "학교")
+PARTICLE_RE = re.compile(r"(에서|으로|에게|부터|까지|이며|이고|와|과|은|는|이|가|을|를|의|에|로|및)$")
+TOKEN_RE = re.compile(r"[가-힣A-Za-z][가-힣A-Za-z0-9+#.]+")
+PROFILE_STOPWORDS = {"주요", "업무", "담당", "개선", "개발", "학사", "석사", "박사", "졸업", "재학", "경력", "기간",
+                     "프로젝트", "성과", "수행", "활용", "관련", "경험"}
+RELEVANCE_THRESHOLD = 0.25
+
+def extract_profile_terms(resume_data):
+    """이력서에서 회사/학교/기술 용어와 가중치 추출 (기관명 3, 기술 2, 기타 경력 1)"""
+    weights = {}
+    sources = [
+        ("education", 1.0), ("experience", 1.0), ("skills", 2.0),
+        ("certification", 1.0), ("activities", 1.0), ("awards", 1.0),
+    ]
+    for field, base in sources:
+        for token in TOKEN_RE.findall(resume_data.get(field) or ""):
+            token = PARTICLE_RE.sub("", token.strip(".")) if re.match(r"[가-힣]", token) else token.strip(".")
+            if len(token) < 2 or token in PROFILE_STOPWORDS or token in INSTITUTION_SUFFIXES:
+                continue
+            weight = 3.0 if token.endswith(INSTITUTION_SUFFIXES) else base
+            weights[token.lower()] = max(weights.get(token.lower(), 0.0), weight)
+    return weights
+
+def score_reputations(reputations, name, resume_data):
+    """모든 스니펫을 한 번에 점수화하고 관련성 순으로 정렬해 반환"""
+    if not reputations:
+        return []
+    snippets = [(rep.get('snippet') or '').lower() for rep in reputations]
+    profile = extract_profile_terms(resume_data)
+    vocab = list(profile) + POSITIVE_TERMS + NEGATIVE_TERMS
+    n_profile, n_pos = len(profile), len(POSITIVE_TERMS)
+
+    # 출현 행렬 (스니펫 × 용어)
+    counts = np.array([[snippet.count(term) for term in vocab] for snippet in snippets], dtype=np.float32)
+    profile_weights = np.array(list(profile.values()), dtype=np.float32)
+    polarity_weights = np.concatenate([np.ones(n_pos, dtype=np.float32), -np.ones(len(NEGATIVE_TERMS), dtype=np.float32)])
+
+    # 관련성: 이력서 용어 가중 일치 (스니펫당 중복 출현은 1회로 계산) × 이름 언급 여부
+    if n_profile:
+        overlap = np.minimum(counts[:, :n_profile], 1.0) @ profile_weights
+        relevance = 1.0 - np.exp(-overlap / 3.0)
+    else:
+        relevance = np.zeros(len(snippets), dtype=np.float32)
+    name_mentioned = np.array([name.lower() in snippet for snippet in snippets], dtype=np.float32)
+    relevance = relevance * (0.45 + 0.45 * name_mentioned) + 0.1 * name_mentioned
+
+    # 극성: (긍정 - 부정) / (전체 + 1), 범위 -1 ~ 1
+    lexicon_counts = counts[:, n_profile:]
+    polarity = (lexicon_counts @ polarity_weights) / (lexicon_counts.sum(axis=1) + 1.0)
+
+    order = np.argsort(-relevance, kind="stable")
+    return [
+        {**reputations[i], 'relevance': float(relevance[i]), 'polarity': float(polarity[i])}
+        for i in order
+    ]
+
+def polarity_label(polarity):
+    if polarity > 0.2:
+        return "🟢 긍정"
+    if polarity < -0.2:
+        return "🔴 부정"
+    return "⚪ 중립"
+
+# 이력서 텍스트 생성 함수 (GPT를 사용하지 않고 컴파일된 템플릿으로 포맷팅)
+def generate_resume_text(data, fmt="markdown"):
+    """입력된 이력서 데이터를 Markdown(기본)/HTML/텍스트 형식으로 변환합니다."""
+    return render_resume(data, fmt)
 
 
 if submitted:
@@ -171,6 +211,9 @@ if submitted:
         st.subheader("📄 생성된 이력서")
         # Markdown으로 렌더링하여 깔끔하게 표시
         st.markdown(generated_resume_text) 
+        st.session_state.generated_resume_text = generated_resume_text
+        st.session_state.generated_resume_data = resume_data
+        st.session_state.generated_cover_letter = ""
 
         # 2. 자기소개서 생성 프롬프트
         # 이력서 전체 정보를 포함하여 자기소개서 생성 요청
@@ -186,7 +229,7 @@ if submitted:
 
         with st.spinner("자기소개서를 생성 중입니다..."):
             try:
-                response = openai.chat.completions.create(
+                response = get_cover_letter_client(openai.api_key).chat.completions.create(
                     model="gpt-4o-mini", # 더 강력한 모델 사용 (필요에 따라 gpt-3.5-turbo 또는 gpt-4 사용)
                     messages=[
                         {"role": "system", "content": "친절하고 전문적인 이력서 및 자기소개서 작성 도우미입니다. 사용자에게 최적화된 문서를 생성합니다."},
@@ -194,10 +237,14 @@ if submitted:
                     ],
                     temperature=0.7,
                     max_tokens=1200, # 자기소개서가 길어질 수 있으므로 토큰 증가
+                    timeout=COVER_LETTER_TIMEOUT, # 응답이 늦어지면 스피너가 무한정 돌지 않도록 제한 (재시도 없음)
                 )
                 cover_letter = response.choices[0].message.content.strip()
                 st.subheader("📝 생성된 자기소개서")
                 st.write(cover_letter)
+                st.session_state.generated_cover_letter = cover_letter
+            except openai.APITimeoutError:
+                st.error(f"자기소개서 생성 응답이 {COVER_LETTER_TIMEOUT}초 안에 오지 않았습니다. 잠시 후 다시 시도해주세요.")
             except openai.APIError as e:
                 st.error(f"OpenAI API 호출 중 오류가 발생했습니다: {e.status_code} - {e.response.text}")
                 st.warning("API 키가 유효한지, 또는 사용량 한도를 초과하지 않았는지 확인해주세요.")
@@ -206,20 +253,105 @@ if submitted:
 
         # 3. 인터넷 평판 조회 및 출력
         if name: # 이름이 입력되었을 때만 평판 조회
-            reputations = fetch_reputation(name)
-            st.subheader(f"🌐 인터넷 평판 조회 결과 ({len(reputations)}건)")
-            if reputations:
-                for idx, rep in enumerate(reputations, 1):
-                    snippet = rep.get('snippet', '')
-                    url = rep.get('url', '')
-                    if url:
-                        st.markdown(f"**{idx}.** {snippet} [출처]({url})")
-                    else:
-                        st.markdown(f"**{idx}.** {snippet}")
+            reputations = score_reputations(fetch_reputation(name), name, resume_data)
+            relevant = [rep for rep in reputations if rep['relevance'] >= RELEVANCE_THRESHOLD]
+            others = [rep for rep in reputations if rep['relevance'] < RELEVANCE_THRESHOLD]
+            st.subheader(f"🌐 인터넷 평판 조회 결과 (관련 {len(relevant)}건 / 전체 {len(reputations)}건)")
+
+            def render_reputation(idx, rep):
+                snippet = rep.get('snippet', '')
+                url = rep.get('url', '')
+                badge = f"`관련도 {rep['relevance'] * 100:.0f}%` {polarity_label(rep['polarity'])}"
+                if url:
+                    st.markdown(f"**{idx}.** {badge} {snippet} [출처]({url})")
+                else:
+                    st.markdown(f"**{idx}.** {badge} {snippet}")
+
+            if relevant:
+                positive = sum(1 for rep in relevant if rep['polarity'] > 0.2)
+                negative = sum(1 for rep in relevant if rep['polarity'] < -0.2)
+                st.caption(f"이력서의 회사·학교·기술과 겹치는 결과만 관련 결과로 표시합니다. (긍정 {positive}건 · 부정 {negative}건)")
+                for idx, rep in enumerate(relevant, 1):
+                    render_reputation(idx, rep)
             else:
                 st.write("관련 평판 정보를 찾을 수 없습니다. (이름이 불분명하거나 공개된 정보가 적을 수 있습니다)")
+            if others:
+                with st.expander(f"동명이인 등 관련성이 낮은 결과 {len(others)}건"):
+                    for idx, rep in enumerate(others, 1):
+                        render_reputation(idx, rep)
         else:
             st.info("평판 조회를 위해 이름을 입력해주세요.")
 
         st.success("이력서, 자기소개서 생성 및 평판 조회가 완료되었습니다.")
         st.balloons()
+
+# 4. 내보내기 (다운로드 요청 시에만 파일 생성, 내용 해시로 캐시)
+@st.cache_resource
+def get_export_engine():
+    return ExportEngine()
+
+if st.session_state.get("generated_resume_text"):
+    st.header("💾 내보내기")
+    engine = get_export_engine()
+    export_docs = {
+        "resume": ("이력서", ExportDocument(body=st.session_state.generated_resume_text)),
+    }
+    if st.session_state.get("generated_cover_letter"):
+        export_docs["cover_letter"] = ("자기소개서", ExportDocument(body=st.session_state.generated_cover_letter, title="자기소개서"))
+
+    col_doc, col_fmt = st.columns(2)
+    with col_doc:
+        export_target = st.selectbox("문서", list(export_docs.keys()), format_func=lambda key: export_docs[key][0])
+    with col_fmt:
+        export_fmt = st.selectbox("형식", ["docx", "pdf", "md", "txt"], format_func=lambda key: EXPORT_FORMATS[key][0])
+
+    if st.button("📦 파일 준비"):
+        st.session_state.export_requested = (export_target, export_fmt)
+
+    if st.session_state.get("export_requested") == (export_target, export_fmt):
+        export_doc = export_docs[export_target][1]
+        if export_target == "resume" and export_fmt == "txt":
+            # 텍스트 파일은 Markdown 기호 없는 전용 템플릿으로 렌더링
+            export_doc = ExportDocument(body=generate_resume_text(st.session_state.generated_resume_data, "text"))
+        try:
+            st.download_button(
+                f"{EXPORT_FORMATS[export_fmt][0]} 다운로드",
+                data=engine.render(export_fmt, export_doc),
+                file_name=engine.file_name(export_target, export_fmt, export_doc),
+                mime=EXPORT_FORMATS[export_fmt][1],
+            )
+        except Exception as e:
+            st.error(f"파일 생성 중 오류가 발생했습니다: {e}")
+
+# 5. 대량 이력서 내보내기 (HR용) — 지원자 목록을 한 건씩 렌더링해 디스크의 ZIP으로 흘려 씀 (캐시 미사용)
+BATCH_FORMATS = {"md": "markdown", "html": "html", "txt": "text", "docx": "markdown", "pdf": "markdown"}
+
+def iter_candidates(uploaded):
+    """업로드 파일(JSON 배열 / JSON Lines / CSV)에서 지원자 dict를 한 건씩 읽어 반환"""
+    name = uploaded.name.lower()
+    if name.endswith(".csv"):
+        yield from csv.DictReader(io.TextIOWrapper(uploaded, encoding="utf-8-sig"))
+    elif name.endswith(".jsonl"):
+        for line in io.TextIOWrapper(uploaded, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from json.load(uploaded)
+
+with st.expander("📚 대량 이력서 내보내기 (HR)"):
+    uploaded_candidates = st.file_uploader("지원자 목록 (JSON / JSONL / CSV)", type=["json", "jsonl", "csv"])
+    batch_fmt = st.selectbox("형식", list(BATCH_FORMATS), key="batch_format",
+                             format_func=lambda key: EXPORT_FORMATS[key][0] if key in EXPORT_FORMATS else "🌐 HTML")
+    if uploaded_candidates and st.button("🗜️ ZIP 만들기"):
+        engine = get_export_engine()
+        entries = get_resume_engine().render_named(iter_candidates(uploaded_candidates), BATCH_FORMATS[batch_fmt])
+        if batch_fmt in ("docx", "pdf"):
+            docs = ((file_name.rsplit(".", 1)[0], ExportDocument(body=text)) for file_name, text in entries)
+            entries = engine.iter_batch(docs, (batch_fmt,))
+        try:
+            with tempfile.TemporaryFile() as archive:
+                engine.stream_zip(entries, fileobj=archive)
+                st.download_button("🗜️ ZIP 다운로드", data=archive.read(), file_name=f"resumes_{batch_fmt}.zip",
+                                   mime=EXPORT_FORMATS["zip"][1])
+        except Exception as e:
+            st.error(f"대량 내보내기 중 오류가 발생했습니다: {e}")
@@ -0,0 +1,363 @@
+"""자기소개서/이력서 내보내기 엔진
+
+- 다운로드가 요청된 시점에만 payload를 생성하고, 내용 해시로 캐시합니다.
+- DOCX/PDF는 외부 라이브러리 없이 최소 규격으로 직접 생성합니다.
+- 대량 내보내기는 문서를 하나씩 렌더링해 ZIP으로 흘려 씁니다.
+"""
+import hashlib
+import json
+import re
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from xml.sax.saxutils import escape
+
+# ===== 형식 정의 =====
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "md": ("📄 Markdown", "text/markdown"),
+    "txt": ("📝 텍스트", "text/plain"),
+    "docx": ("📘 Word (DOCX)", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "pdf": ("📕 PDF", "application/pdf"),
+    "json": ("💾 프로젝트 (JSON)", "application/json"),
+    "zip": ("🗜️ 전체 묶음 (ZIP)", "application/zip"),
+}
+
+
+@dataclass(frozen=True)
+class ExportDocument:
+    """내보낼 문서 한 건 (title/header는 선택)"""
+    body: str
+    title: str = ""
+    header_lines: Tuple[str, ...] = ()
+    footer: str = ""
+
+    def digest(self) -> str:
+        h = hashlib.sha256()
+        for part in (self.title, *self.header_lines, self.footer, self.body):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+
+# ===== Markdown → 블록 변환 (DOCX/PDF 공용) =====
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
+_NON_BMP_RE = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def _plain_inline(text: str) -> str:
+    """인라인 마크다운(굵게/링크/기울임) 기호 제거"""
+    text = _LINK_RE.sub(r"\1 (\2)", text)
+    text = _BOLD_RE.sub(r"\1", text)
+    return text.replace("*", "").strip()
+
+
+def markdown_blocks(doc: ExportDocument) -> List[Tuple[str, str]]:
+    """문서를 (종류, 원문) 블록 목록으로 변환. 종류: h1/h2/h3/bullet/para/rule"""
+    blocks: List[Tuple[str, str]] = []
+    if doc.title:
+        blocks.append(("h1", doc.title))
+    for line in doc.header_lines:
+        blocks.append(("para", line))
+    for raw in doc.body.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if line.startswith("### "):
+            blocks.append(("h3", line[4:]))
+        elif line.startswith("## "):
+            blocks.append(("h2", line[3:]))
+        elif line.startswith("# "):
+            blocks.append(("h1", line[2:]))
+        elif line.startswith(("- ", "* ", "• ")):
+            blocks.append(("bullet", line[2:]))
+        elif line in ("---", "***"):
+            blocks.append(("rule", ""))
+        else:
+            blocks.append(("para", line))
+    if doc.footer:
+        blocks.append(("rule", ""))
+        blocks.append(("para", doc.footer))
+    return blocks
+
+
+# ===== 렌더러 =====
+def render_markdown(doc: ExportDocument) -> bytes:
+    parts = []
+    if doc.title:
+        parts.append(f"# {doc.title}\n")
+    if doc.header_lines:
+        parts.append("\n".join(doc.header_lines) + "\n")
+    parts.append(doc.body + "\n")
+    if doc.footer:
+        parts.append(f"---\n*{doc.footer}*\n")
+    return "\n".join(parts).encode("utf-8")
+
+
+def render_text(doc: ExportDocument) -> bytes:
+    return doc.body.encode("utf-8")
+
+
+_DOCX_SIZES = {"h1": 36, "h2": 30, "h3": 26}  # half-point 단위
+
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+
+def _docx_runs(text: str, bold: bool = False, size: Optional[int] = None) -> str:
+    """**굵게** 구간을 별도 run으로 분리"""
+    text = _LINK_RE.sub(r"\1 (\2)", text)
+    runs = []
+    for i, segment in enumerate(_BOLD_RE.split(text)):
+        if not segment:
+            continue
+        props = '<w:rFonts w:ascii="Malgun Gothic" w:hAnsi="Malgun Gothic" w:eastAsia="맑은 고딕"/>'
+        if bold or i % 2 == 1:
+            props += "<w:b/>"
+        if size:
+            props += f'<w:sz w:val="{size}"/>'
+        runs.append(f'<w:r><w:rPr>{props}</w:rPr><w:t xml:space="preserve">{escape(segment)}</w:t></w:r>')
+    return "".join(runs)
+
+
+def render_docx(doc: ExportDocument) -> bytes:
+    paragraphs = []
+    for kind, text in markdown_blocks(doc):
+        if kind in _DOCX_SIZES:
+            paragraphs.append(f'<w:p><w:pPr><w:spacing w:before="240" w:after="120"/></w:pPr>'
+                              f'{_docx_runs(text, bold=True, size=_DOCX_SIZES[kind])}</w:p>')
+        elif kind == "bullet":
+            paragraphs.append(f'<w:p><w:pPr><w:ind w:left="360"/></w:pPr>{_docx_runs("• " + text)}</w:p>')
+        elif kind == "rule":
+            paragraphs.append('<w:p><w:pPr><w:pBdr><w:bottom w:val="single" w:sz="6" w:space="1" w:color="auto"/>'
+                              '</w:pBdr></w:pPr></w:p>')
+        else:
+            paragraphs.append(f'<w:p>{_docx_runs(text)}</w:p>')
+
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+        + "".join(paragraphs)
+        + '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+        '<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440"/></w:sectPr>'
+        '</w:body></w:document>'
+    )
+
+    with tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024) as buffer:
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("[Content_Types].xml", _DOCX_CONTENT_TYPES)
+            zf.writestr("_rels/.rels", _DOCX_RELS)
+            zf.writestr("word/document.xml", document)
+        buffer.seek(0)
+        return buffer.read()
+
+
+# PDF: A4, 한글은 뷰어 내장 CID 폰트(HYSMyeongJo-Medium)를 UniKS-UCS2-H로 참조
+_PDF_PAGE_W, _PDF_PAGE_H, _PDF_MARGIN = 595, 842, 56
+_PDF_SIZES = {"h1": 18, "h2": 15, "h3": 13, "bullet": 11, "para": 11}
+
+
+def _pdf_char_width(ch: str) -> float:
+    return 0.5 if ord(ch) < 0x80 else 1.0
+
+
+def _pdf_wrap(text: str, size: int) -> List[str]:
+    """폭(em 단위) 기준 줄바꿈. 공백 우선, 긴 단어는 글자 단위로 분할"""
+    max_em = (_PDF_PAGE_W - 2 * _PDF_MARGIN) / size
+    lines: List[str] = []
+    current, width = "", 0.0
+    for word in re.split(r"(\s+)", text):
+        if not word:
+            continue
+        word_w = sum(_pdf_char_width(c) for c in word)
+        if width + word_w <= max_em:
+            current, width = current + word, width + word_w
+            continue
+        if current.strip():
+            lines.append(current.rstrip())
+        current, width = "", 0.0
+        if word.isspace():
+            continue
+        for ch in word:
+            cw = _pdf_char_width(ch)
+            if width + cw > max_em:
+                lines.append(current)
+                current, width = "", 0.0
+            current, width = current + ch, width + cw
+    if current.strip():
+        lines.append(current.rstrip())
+    return lines
+
+
+def _pdf_hex(text: str) -> str:
+    return _NON_BMP_RE.sub("", text).encode("utf-16-be").hex().upper()
+
+
+def render_pdf(doc: ExportDocument) -> bytes:
+    # 1) 블록 → 페이지별 (size, y, text) 배치
+    pages: List[List[Tuple[int, float, str]]] = [[]]
+    y = _PDF_PAGE_H - _PDF_MARGIN
+    for kind, text in markdown_blocks(doc):
+        if kind == "rule":
+            y -= 8
+            continue
+        size = _PDF_SIZES[kind]
+        text = _plain_inline(_NON_BMP_RE.sub("", text))
+        if kind == "bullet":
+            text = "· " + text
+        if kind.startswith("h"):
+            y -= size * 0.6
+        for line in _pdf_wrap(text, size) or [""]:
+            if y - size * 1.45 < _PDF_MARGIN:
+                pages.append([])
+                y = _PDF_PAGE_H - _PDF_MARGIN
+            y -= size * 1.45
+            pages[-1].append((size, y, line))
+        y -= 4
+
+    # 2) 객체 직렬화
+    objects: List[bytes] = []
+
+    def add(obj: str) -> int:
+        objects.append(obj.encode("latin-1"))
+        return len(objects)
+
+    catalog_id = add("")  # 자리 확보 후 채움
+    pages_id = add("")
+    font_id = add(
+        "<< /Type /Font /Subtype /Type0 /BaseFont /HYSMyeongJo-Medium /Encoding /UniKS-UCS2-H "
+        "/DescendantFonts [<< /Type /Font /Subtype /CIDFontType0 /BaseFont /HYSMyeongJo-Medium "
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (Korea1) /Supplement 1 >> "
+        "/FontDescriptor << /Type /FontDescriptor /FontName /HYSMyeongJo-Medium /Flags 6 "
+        "/FontBBox [0 -148 1001 880] /ItalicAngle 0 /Ascent 880 /Descent -148 /CapHeight 880 /StemV 91 >> "
+        "/DW 1000 /W [1 95 500] >>] >>"
+    )
+    page_ids = []
+    for lines in pages:
+        stream = "".join(
+            f"BT /F1 {size} Tf {_PDF_MARGIN} {y:.1f} Td <{_pdf_hex(line)}> Tj ET\n"
+            for size, y, line in lines
+        )
+        content_id = add(f"<< /Length {len(stream)} >>\nstream\n{stream}endstream")
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {_PDF_PAGE_W} {_PDF_PAGE_H}] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ))
+    objects[catalog_id - 1] = f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode("latin-1")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects[pages_id - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode("latin-1") + obj + b"\nendobj\n"
+    xref_at = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{off:010d} 00000 n \n" for off in offsets).encode("latin-1")
+    out += (f"trailer\n<< /Size {len(objects) + 1} /Root {catalog_id} 0 R >>\n"
+            f"startxref\n{xref_at}\n%%EOF\n").encode("latin-1")
+    return bytes(out)
+
+
+RENDERERS = {
+    "md": render_markdown,
+    "txt": render_text,
+    "docx": render_docx,
+    "pdf": render_pdf,
+}
+
+
+# ===== 엔진 =====
+class ExportEngine:
+    """내용 해시 기반 LRU 캐시를 가진 지연 렌더링 엔진 (프로세스 공유, 스레드 안전)"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: str, build) -> bytes:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        data = build()
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = data
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return data
+
+    def render(self, fmt: str, doc: ExportDocument) -> bytes:
+        if fmt not in RENDERERS:
+            raise ValueError(f"지원하지 않는 형식입니다: {fmt}")
+        return self._cached(f"{fmt}:{doc.digest()}", lambda: RENDERERS[fmt](doc))
+
+    def render_json(self, data: Dict) -> bytes:
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+        key = "json:" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return self._cached(key, lambda: text.encode("utf-8"))
+
+    def render_zip(self, doc: ExportDocument, formats: Iterable[str] = ("md", "txt", "docx", "pdf"),
+                   stem: str = "document", extra: Optional[Dict[str, bytes]] = None) -> bytes:
+        """한 문서를 여러 형식으로 묶은 ZIP. 형식별 결과만 캐시하고 묶음 자체는 캐시에 올리지 않음"""
+        entries = [(f"{stem}.{fmt}", self.render(fmt, doc)) for fmt in formats]
+        entries.extend((extra or {}).items())
+        with self.stream_zip(entries) as buffer:
+            return buffer.read()
+
+    @staticmethod
+    def file_name(stem: str, fmt: str, content: Union[ExportDocument, bytes, None] = None) -> str:
+        """내용 해시 기반 파일명 (재실행해도 동일 → 캐시 유지).
+        content는 파일 내용을 결정하는 입력 전체 (문서 한 건이면 ExportDocument, 그 외에는 원본 바이트)"""
+        if content is None:
+            return f"{stem}.{fmt}"
+        digest = content.digest() if isinstance(content, ExportDocument) else hashlib.sha256(content).hexdigest()
+        return f"{stem}_{digest[:10]}.{fmt}"
+
+    @staticmethod
+    def stream_zip(entries: Iterable[Tuple[str, Union[bytes, str]]],
+                   fileobj: Optional[BinaryIO] = None,
+                   spool_limit: int = 16 * 1024 * 1024) -> BinaryIO:
+        """(파일명, 내용) 스트림을 ZIP으로 기록. 메모리 한도를 넘으면 디스크로 넘김 (반환된 파일은 호출자가 닫음)"""
+        if fileobj is None:
+            fileobj = tempfile.SpooledTemporaryFile(max_size=spool_limit)
+        with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, payload in entries:
+                if isinstance(payload, str):
+                    payload = payload.encode("utf-8")
+                zf.writestr(name, payload)
+        fileobj.seek(0)
+        return fileobj
+
+    def iter_batch(self, docs: Iterable[Tuple[str, ExportDocument]],
+                   formats: Iterable[str] = ("md",)) -> Iterator[Tuple[str, bytes]]:
+        """대량 내보내기용: 캐시를 거치지 않고 한 건씩 렌더링"""
+        formats = tuple(formats)
+        for stem, doc in docs:
+            for fmt in formats:
+                yield f"{stem}.{fmt}", RENDERERS[fmt](doc)
@@ -0,0 +1,165 @@
+"""지연 시간 제어: 단계별 데드라인과 첫 토큰 지연 기반 헤징"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from metrics import Metrics
+
+
+# ===== 지연 시간 제어 (단계별 데드라인 + 헤징) =====
+STAGE_DEADLINES = {  # 단계별 전체 응답 제한 시간(초)
+    "draft": 90,
+    "refine": 60,
+    "section": 45,
+    "keywords": 30,
+    "default": 60,
+}
+HEDGE_ENABLED = os.getenv("COVERLETTER_HEDGE", "1") != "0"
+HEDGE_PERCENTILE = 0.95   # 첫 토큰 지연이 이 분위수를 넘으면 복제 요청 발송
+HEDGE_MIN_SAMPLES = 20    # 이 이상 관측된 뒤부터 헤징
+HEDGE_MIN_DELAY = 1.0
+
+
+class AttemptCancelled(Exception):
+    pass
+
+
+class LatencyTracker:
+    """모델별 첫 토큰 지연(TTFT)과 스트리밍 시간 관측값 (최근 N개)"""
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._window = window
+        self._ttft: Dict[str, deque] = {}
+        self._streaming: Dict[str, deque] = {}
+
+    def record(self, model: str, ttft: float, total: float) -> None:
+        with self._lock:
+            self._ttft.setdefault(model, deque(maxlen=self._window)).append(ttft)
+            self._streaming.setdefault(model, deque(maxlen=self._window)).append(max(0.0, total - ttft))
+
+    def record_ttft(self, model: str, ttft: float) -> None:
+        """끝까지 받지 못한 시도의 첫 토큰 지연만 기록.
+        첫 토큰 전에 취소·시간 초과된 시도는 경과 시간을 하한값으로 넣어, 느린 요청이 관측에서 빠져
+        분위수가 낮게 잡히는 것을 막음"""
+        with self._lock:
+            self._ttft.setdefault(model, deque(maxlen=self._window)).append(ttft)
+
+    def expected_total(self, model: str, elapsed: float, ttft: Optional[float]) -> float:
+        """elapsed초 동안 끝나지 않은 요청의 예상 전체 시간.
+        첫 토큰 전이면 elapsed 이상인 TTFT 관측값의 중앙값을 첫 토큰 시점으로 가정"""
+        if ttft is None:
+            with self._lock:
+                slower = sorted(t for t in self._ttft.get(model, ()) if t >= elapsed)
+            ttft = slower[len(slower) // 2] if slower else elapsed
+        return max(elapsed, ttft + self.median_streaming(model))
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """헤징 기준 시간 (관측이 부족하면 None)"""
+        with self._lock:
+            samples = sorted(self._ttft.get(model, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, samples[min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE))])
+
+    def median_streaming(self, model: str) -> float:
+        with self._lock:
+            samples = sorted(self._streaming.get(model, ()))
+        return samples[len(samples) // 2] if samples else 0.0
+
+
+class HedgedExecutor:
+    """데드라인 안에서 요청을 실행하고, 첫 토큰이 늦으면 복제 요청을 보내 먼저 끝난 쪽을 채택"""
+    def __init__(self, metrics: Metrics, tracker: Optional[LatencyTracker] = None):
+        self.metrics = metrics
+        self.tracker = tracker or LatencyTracker()
+
+    def run(self, attempt, model: str, stage: str, hedge: bool = HEDGE_ENABLED):
+        """attempt(cancel_event, on_first_token, timeout) → 결과. 데드라인 초과 시 TimeoutError"""
+        limit = STAGE_DEADLINES.get(stage, STAGE_DEADLINES["default"])
+        started = time.monotonic()
+        deadline = started + limit
+        results: "queue.Queue" = queue.Queue()
+        attempts: List[Dict] = []
+
+        def launch() -> Dict:
+            state = {"index": len(attempts), "start": time.monotonic(), "first_token": None,
+                     "cancel": threading.Event(), "first_event": threading.Event(), "failed": False}
+
+            def on_first_token():
+                if state["first_token"] is None:
+                    state["first_token"] = time.monotonic()
+                    state["first_event"].set()
+
+            def worker():
+                try:
+                    value = attempt(state["cancel"], on_first_token, max(1.0, deadline - time.monotonic()))
+                    results.put((state, None, value))
+                except BaseException as e:
+                    results.put((state, e, None))
+                finally:
+                    state["first_event"].set()  # 조기 종료 시 헤징 대기 해제
+
+            attempts.append(state)
+            threading.Thread(target=worker, daemon=True, name=f"openai-{stage}-{state['index']}").start()
+            return state
+
+        self.metrics.incr("hedge.requests")
+        primary = launch()
+        delay = self.tracker.hedge_delay(model) if hedge else None
+        if delay is not None and delay < limit:
+            primary["first_event"].wait(delay)
+            if primary["first_token"] is None and results.empty():
+                launch()
+                self.metrics.incr("hedge.sent")
+
+        errors: List[BaseException] = []
+        pending = len(attempts)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                state, error, value = results.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending -= 1
+            if error is not None:
+                state["failed"] = True  # 오류로 끝난 시도는 지연 관측에서 제외
+                errors.append(error)
+                continue  # 다른 시도가 남아 있으면 계속 대기
+
+            finished = time.monotonic()
+            if state is not primary:
+                # 절약 시간 추정: 취소 시점까지 원 요청이 걸린 시간(하한)에서 앞으로 더 걸렸을 시간
+                elapsed = finished - primary["start"]
+                ttft = primary["first_token"] - primary["start"] if primary["first_token"] is not None else None
+                expected = self.tracker.expected_total(model, elapsed, ttft)
+                self.metrics.incr("hedge.won")
+                self.metrics.incr("hedge.saved_seconds", expected - elapsed)
+            for other in attempts:
+                if other is not state:
+                    other["cancel"].set()
+                    self._record_unfinished(model, other, finished)
+            if state["first_token"] is not None:
+                self.tracker.record(model, state["first_token"] - state["start"], finished - state["start"])
+            self.metrics.incr("latency.total_seconds", finished - started)
+            return value
+
+        stopped = time.monotonic()
+        for state in attempts:
+            state["cancel"].set()
+            self._record_unfinished(model, state, stopped)
+        if errors and pending == 0:
+            raise errors[0]
+        self.metrics.incr("deadline.exceeded")
+        raise TimeoutError(f"응답 시간 초과 ({limit}초)")
+
+    def _record_unfinished(self, model: str, state: Dict, stopped: float) -> None:
+        """취소·시간 초과된 시도의 TTFT 기록 (첫 토큰 전이면 경과 시간을 하한값으로)"""
+        if state["failed"]:
+            return
+        first = state["first_token"]
+        self.tracker.record_ttft(model, (first if first is not None else stopped) - state["start"])
@@ -0,0 +1,249 @@
+"""채용공고 지문 저장소
+
+정규화 텍스트의 SimHash와 핵심 섹션 자카드 유사도로 사실상 같은 공고를 묶어,
+키워드 추출 결과를 SQLite에 보관하고 재사용합니다.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from metrics import Metrics
+from text_store import TextStore
+
+
+# ===== 채용공고 지문 저장소 =====
+JD_DB_PATH = os.getenv("COVERLETTER_JD_DB", "coverletter_jd.sqlite3")
+JD_SIMHASH_DISTANCE = 3   # 해밍 거리 이하면 같은 공고로 간주
+JD_SIMHASH_BANDS = 4      # 16비트 × 4 밴드 (거리 3 이하면 최소 한 밴드가 일치)
+JD_MIN_JACCARD = 0.8      # SimHash 후보도 핵심 섹션 단어 집합이 이 이상 겹쳐야 같은 공고로 간주
+JD_CORE_SECTIONS = ("주요업무", "담당업무", "업무내용", "자격요건", "필수요건", "필수사항", "지원자격")
+JD_BULLET_RE = re.compile(r'^\s*(?:[-*•·▪▶►■□○●◆◇※✔✓]+|\d+[.)]|[가-하][.)]|\(\d+\))\s*', re.MULTILINE)
+JD_SECTION_RE = re.compile(
+    r'^\s*[\[【<(#]*\s*(주요\s*업무|담당\s*업무|업무\s*내용|자격\s*요건|필수\s*(?:요건|사항)|지원\s*자격|'
+    r'우대\s*사항|복리\s*후생|근무\s*(?:조건|환경)|전형\s*절차|회사\s*소개)\s*[\]】>):]*\s*$',
+    re.MULTILINE
+)
+
+
+class CoverageMatcher:
+    """키워드 목록을 미리 소문자/어절 단위로 전처리해 둔 커버리지 판정기"""
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(keywords)
+        self._table = [(kw, kw.lower(), kw.lower().split()) for kw in self.keywords]
+
+    def analyze(self, draft: str) -> Dict:
+        draft_lower = draft.lower()
+        covered = []
+        partial_matches = []
+        missing = []
+
+        for keyword, kw_lower, words in self._table:
+            if kw_lower in draft_lower:
+                covered.append(keyword)
+            elif any(word in draft_lower for word in words):
+                partial_matches.append(keyword)
+            else:
+                missing.append(keyword)
+
+        coverage = round(100.0 * len(covered) / max(1, len(self.keywords)), 1)
+        partial_coverage = round(100.0 * len(partial_matches) / max(1, len(self.keywords)), 1)
+
+        return {
+            "covered": covered,
+            "partial_matches": partial_matches,
+            "missing": missing,
+            "coverage": coverage,
+            "partial_coverage": partial_coverage,
+            "total_coverage": coverage + partial_coverage * 0.5
+        }
+
+
+class JDFingerprintStore:
+    """정규화 텍스트 + SimHash로 유사 공고를 하나의 대표 항목에 묶어 키워드/섹션 분석 결과를 재사용 (프로세스 공유, SQLite 영속)"""
+    def __init__(self, db_path: str = JD_DB_PATH, metrics: Optional[Metrics] = None):
+        self.metrics = metrics or Metrics()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jd_fingerprints (
+                id TEXT PRIMARY KEY,
+                simhash TEXT NOT NULL,
+                keywords TEXT NOT NULL,
+                top_k INTEGER NOT NULL,
+                sections TEXT,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                core_text TEXT
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jd_fingerprints)")}
+        if "core_text" not in columns:  # 이전 버전 DB (core_text 없는 항목은 다시 저장될 때까지 재사용하지 않음)
+            self._conn.execute("ALTER TABLE jd_fingerprints ADD COLUMN core_text TEXT")
+        self._conn.commit()
+        self._entries: Dict[str, Dict] = {}
+        self._bands: Dict[Tuple[int, int], List[str]] = {}
+        self._matchers: Dict[Tuple[str, ...], CoverageMatcher] = {}
+        for row in self._conn.execute(
+            "SELECT id, simhash, keywords, top_k, sections, hits, core_text FROM jd_fingerprints"
+        ):
+            self._index({
+                "id": row[0], "simhash": int(row[1], 16), "keywords": json.loads(row[2]),
+                "top_k": row[3], "sections": json.loads(row[4]) if row[4] else {}, "hits": row[5],
+                "shingles": self.shingles(row[6]) if row[6] is not None else None,
+            })
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """공백/글머리표/장식 문자 차이를 없앤 비교용 텍스트"""
+        text = unicodedata.normalize("NFKC", text).lower()
+        text = JD_BULLET_RE.sub("", text)
+        text = re.sub(r'[\[\]【】<>()#*=_~|]+', ' ', text)
+        return re.sub(r'\s+', ' ', text).strip()
+
+    @staticmethod
+    def features(normalized: str) -> List[str]:
+        """단어 + 단어 bigram 특징"""
+        words = normalized.split()
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    @classmethod
+    def shingles(cls, normalized: str) -> frozenset:
+        return frozenset(cls.features(normalized))
+
+    @classmethod
+    def core_text(cls, text: str, sections: Dict[str, str]) -> str:
+        """주요업무/자격요건 등 핵심 섹션만 모은 정규화 텍스트 (섹션이 없으면 전체).
+        회사 소개·복리후생처럼 같은 회사 공고끼리 겹치는 부분이 유사도를 끌어올리지 않도록"""
+        core = [body for name, body in sections.items() if name in JD_CORE_SECTIONS and body]
+        return cls.normalize("\n".join(core) if core else text)
+
+    @staticmethod
+    def jaccard(a: frozenset, b: frozenset) -> float:
+        if not a and not b:
+            return 1.0
+        return len(a & b) / len(a | b)
+
+    @classmethod
+    def simhash(cls, normalized: str) -> int:
+        """단어 + 단어 bigram 특징의 64비트 SimHash"""
+        features = cls.features(normalized)
+        if not features:
+            return 0
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big") for f in features),
+            dtype=np.uint64, count=len(features)
+        )
+        bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+        votes = (bits.astype(np.int32) * 2 - 1).sum(axis=0)
+        return int(sum(1 << i for i in range(64) if votes[i] > 0))
+
+    @staticmethod
+    def split_sections(text: str) -> Dict[str, str]:
+        """공고를 '주요업무/자격요건/우대사항…' 단위로 분리 (머리글이 없으면 빈 dict)"""
+        matches = list(JD_SECTION_RE.finditer(text))
+        sections = {}
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            name = re.sub(r'\s+', '', match.group(1))
+            sections[name] = text[match.end():end].strip()
+        return sections
+
+    def _band_keys(self, value: int) -> List[Tuple[int, int]]:
+        width = 64 // JD_SIMHASH_BANDS
+        return [(band, (value >> (band * width)) & ((1 << width) - 1)) for band in range(JD_SIMHASH_BANDS)]
+
+    def _index(self, entry: Dict) -> None:
+        self._entries[entry["id"]] = entry
+        for key in self._band_keys(entry["simhash"]):
+            self._bands.setdefault(key, []).append(entry["id"])
+
+    def _find(self, value: int, shingles: frozenset) -> Optional[Dict]:
+        """SimHash 후보 중 핵심 섹션 Jaccard가 기준 이상인 가장 유사한 항목"""
+        best, best_similarity = None, JD_MIN_JACCARD
+        seen = set()
+        for key in self._band_keys(value):
+            for entry_id in self._bands.get(key, ()):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                entry = self._entries[entry_id]
+                if entry["shingles"] is None or bin(entry["simhash"] ^ value).count("1") > JD_SIMHASH_DISTANCE:
+                    continue
+                similarity = self.jaccard(entry["shingles"], shingles)
+                if similarity >= best_similarity:
+                    best, best_similarity = entry, similarity
+        return best
+
+    def lookup(self, text: str) -> Optional[Dict]:
+        value = self.simhash(self.normalize(text))
+        shingles = self.shingles(self.core_text(text, self.split_sections(text)))
+        with self._lock:
+            return self._find(value, shingles)
+
+    def lookup_keywords(self, text: str, top_k: int) -> Optional[List[str]]:
+        """대표 항목이 있고 요청 개수 이상 추출되어 있으면 키워드 반환 (없으면 None)"""
+        entry = self.lookup(text)
+        if entry is None or entry["top_k"] < top_k:
+            self.metrics.incr("jd_store.misses")
+            return None
+        with self._lock:
+            entry["hits"] += 1
+            self._conn.execute("UPDATE jd_fingerprints SET hits = ?, last_used = ? WHERE id = ?",
+                               (entry["hits"], time.time(), entry["id"]))
+            self._conn.commit()
+        self.metrics.incr("jd_store.hits")
+        return list(entry["keywords"][:top_k])
+
+    def remember(self, text: str, keywords: List[str], top_k: int) -> Dict:
+        """추출 결과를 대표 항목으로 저장 (유사 항목이 있으면 갱신)"""
+        normalized = self.normalize(text)
+        value = self.simhash(normalized)
+        sections = self.split_sections(text)
+        core_text = self.core_text(text, sections)
+        shingles = self.shingles(core_text)
+        now = time.time()
+        with self._lock:
+            entry = self._find(value, shingles)
+            if entry is None:
+                entry_id = TextStore.make_key(normalized)
+                entry = self._entries.get(entry_id)  # core_text 없이 저장된 이전 항목이면 그대로 갱신
+                if entry is None:
+                    entry = {"id": entry_id, "simhash": value, "hits": 0}
+                    self._index(entry)
+            entry.update(keywords=list(keywords), top_k=top_k, sections=sections)
+            if entry.get("shingles") is None:
+                entry["shingles"] = shingles
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jd_fingerprints "
+                "(id, simhash, keywords, top_k, sections, hits, created, last_used, core_text) "
+                "VALUES (?, ?, ?, ?, ?, ?, COALESCE((SELECT created FROM jd_fingerprints WHERE id = ?), ?), ?, "
+                "COALESCE((SELECT core_text FROM jd_fingerprints WHERE id = ?), ?))",
+                (entry["id"], f"{entry['simhash']:016x}", json.dumps(entry["keywords"], ensure_ascii=False), top_k,
+                 json.dumps(sections, ensure_ascii=False), entry["hits"], entry["id"], now, now,
+                 entry["id"], core_text)
+            )
+            self._conn.commit()
+        return entry
+
+    def matcher(self, keywords: List[str]) -> CoverageMatcher:
+        """키워드 목록별 커버리지 판정기 (메모리 캐시)"""
+        key = tuple(keywords)
+        with self._lock:
+            matcher = self._matchers.get(key)
+            if matcher is None:
+                if len(self._matchers) >= 256:
+                    self._matchers.pop(next(iter(self._matchers)))
+                matcher = self._matchers[key] = CoverageMatcher(keywords)
+        return matcher
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,118 @@
+"""백그라운드 생성 작업 큐 (스레드 풀 + SQLite 결과 저장소)"""
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+
+# ===== 백그라운드 작업 큐 =====
+JOB_WORKERS = int(os.getenv("COVERLETTER_JOB_WORKERS", "4"))  # 노드별 동시 실행 작업 수
+JOB_DB_PATH = os.getenv("COVERLETTER_JOB_DB", "coverletter_jobs.sqlite3")
+JOB_RETENTION_SECONDS = 3600  # 찾아가지 않은 결과(생성된 자기소개서)의 최대 보관 시간
+
+JOB_PENDING = ("queued", "running")
+
+
+class JobQueue:
+    """스레드 풀 워커 + SQLite 결과 저장소. 페이지 재실행/연결 종료와 무관하게 작업을 끝까지 수행.
+    입력(이력서/공고)은 저장하지 않고, 결과는 등록한 브라우저(소유자 토큰)만 한 번 가져갈 수 있음"""
+    def __init__(self, db_path: str = JOB_DB_PATH, max_workers: int = JOB_WORKERS):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if columns and "owner" not in columns:
+            # 이전 버전은 입력 전문을 소유자 확인 없이 보관했으므로 통째로 폐기
+            self._conn.execute("DROP TABLE jobs")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        # 이전 프로세스에서 끝나지 못한 작업은 실패 처리, 오래된 작업은 정리
+        self._conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE status IN ('queued', 'running')",
+            ("서버 재시작으로 작업이 중단되었습니다.", time.time())
+        )
+        self._conn.commit()
+        self.purge()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="coverletter-job")
+
+    @staticmethod
+    def owner_digest(owner_token: str) -> str:
+        """DB에는 소유자 토큰 원문 대신 해시만 저장"""
+        return hashlib.blake2b(owner_token.encode("utf-8"), digest_size=16).hexdigest()
+
+    def purge(self) -> None:
+        """보관 시간이 지난 작업 삭제"""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE updated < ? AND status NOT IN ('queued', 'running')",
+                               (time.time() - JOB_RETENTION_SECONDS,))
+            self._conn.commit()
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def submit(self, kind: str, owner_token: str, fn) -> str:
+        """작업 등록 후 job id 반환. fn()의 반환값(dict)이 결과로 저장됨 (입력은 fn이 들고 있고 DB에는 남기지 않음)"""
+        self.purge()
+        job_id = secrets.token_hex(8)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, owner, kind, status, created, updated) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, self.owner_digest(owner_token), kind, now, now)
+            )
+            self._conn.commit()
+        self._executor.submit(self._run, job_id, fn)
+        return job_id
+
+    def _run(self, job_id: str, fn) -> None:
+        self._update(job_id, status="running")
+        try:
+            result = fn()
+            self._update(job_id, status="done", result=json.dumps(result, ensure_ascii=False))
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e))
+
+    def get(self, job_id: str, owner_token: str) -> Optional[Dict]:
+        """작업 조회. 없거나 다른 브라우저에서 등록한 작업이면 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, owner, kind, status, result, error, created, updated FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None or not hmac.compare_digest(row[1], self.owner_digest(owner_token)):
+            return None
+        return {
+            "id": row[0],
+            "kind": row[2],
+            "status": row[3],
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "created": row[6],
+            "updated": row[7],
+        }
+
+    def discard(self, job_id: str, owner_token: str) -> None:
+        """결과를 세션에 반영한 뒤 삭제 (생성된 자기소개서를 DB에 남기지 않음)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ? AND owner = ? AND status NOT IN ('queued', 'running')",
+                               (job_id, self.owner_digest(owner_token)))
+            self._conn.commit()
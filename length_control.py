@@ -0,0 +1,101 @@
+"""목표 글자 수 제어: 모델별 글자/토큰 비율 학습과 문장 단위 로컬 보정"""
+import math
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from metrics import Metrics
+from text_analysis import TextAnalyzer, split_sections
+from text_store import CoverLetterProject
+
+
+class LengthController:
+    """모델별 '한글 글자 수 / 완성 토큰' 비율을 관측값으로 학습해 max_tokens와 문항별 목표 길이를 정함"""
+    DEFAULT_RATIO = 0.8      # 관측 전 기본값 (한글 글자 / 토큰)
+    EMA_ALPHA = 0.2
+    MIN_SAMPLE_CHARS = 100   # 이보다 짧은 응답은 학습에서 제외
+    TOKEN_SLACK = 1.3        # 목표 대비 토큰 여유
+    TOKEN_OVERHEAD = 80      # 제목/문장부호 등 한글 외 토큰
+    TOLERANCE = 50           # 목표 길이 허용 오차(자)
+    SENTENCE_RE = re.compile(r'((?<=[.!?…])\s+)')  # 구분자를 보존하도록 캡처
+
+    def __init__(self, metrics: Metrics, aliases: Optional[Dict[str, str]] = None):
+        self.metrics = metrics
+        self.aliases = dict(aliases or {})  # 실제 호출 모델로 매핑할 가상 모델명 (예: 자동 → 첫 캐스케이드 모델)
+        self._lock = threading.Lock()
+        self._ratios: Dict[str, float] = {}
+
+    def observe(self, model: str, text: str, completion_tokens: int) -> None:
+        chars = TextAnalyzer.count_korean_chars(text or "")
+        if chars < self.MIN_SAMPLE_CHARS or completion_tokens <= 0:
+            return
+        sample = chars / completion_tokens
+        with self._lock:
+            current = self._ratios.get(model)
+            self._ratios[model] = sample if current is None else current + self.EMA_ALPHA * (sample - current)
+
+    def ratio(self, model: str) -> float:
+        model = self.aliases.get(model, model)
+        with self._lock:
+            return self._ratios.get(model, self.DEFAULT_RATIO)
+
+    def max_tokens(self, model: str, target_chars: int) -> int:
+        tokens = math.ceil(target_chars / self.ratio(model) * self.TOKEN_SLACK) + self.TOKEN_OVERHEAD
+        return max(256, min(4096, tokens))
+
+    @staticmethod
+    def section_targets(project: CoverLetterProject) -> List[Tuple[str, int]]:
+        """문항별 목표 글자 수 (전체 목표를 균등 분배, 10자 단위)"""
+        questions = [q.strip() for q in (project.questions or "").splitlines() if q.strip()] or ["자기소개"]
+        share = int(round(project.target_len / len(questions), -1))
+        return [(question, share) for question in questions]
+
+    def fit(self, text: str, target: int) -> Tuple[str, int]:
+        """로컬 보정: 목표보다 길면 문장 단위로 덜어냄. (결과, 목표 대비 차이) 반환
+
+        문장 사이 구분자(공백/문단 나눔)는 그대로 보존하고, 실제로 줄인 문항 본문만 원문에서 교체합니다.
+        """
+        sections = split_sections(text)
+        answer_idx = [i for i, (header, _) in enumerate(sections) if header] or list(range(len(sections)))
+        # 문항별 [문장, 구분자, 문장, 구분자, ..., 문장]
+        parts = {i: self.SENTENCE_RE.split(sections[i][1]) for i in answer_idx}
+        total = TextAnalyzer.count_korean_chars(text)
+        section_target = target / max(1, len(answer_idx))
+        trimmed = set()
+
+        while total > target + self.TOLERANCE:
+            # 목표 대비 가장 많이 넘친 문항에서, 목표에 가장 가깝게 만드는 문장(첫 문장 제외)을 제거
+            candidates = [i for i in answer_idx if len(parts[i]) > 1]
+            if not candidates:
+                break
+            i = max(candidates, key=lambda idx: TextAnalyzer.count_korean_chars("".join(parts[idx])) - section_target)
+            sentence_pos = list(range(2, len(parts[i]), 2))
+            lengths = {k: TextAnalyzer.count_korean_chars(parts[i][k]) for k in sentence_pos}
+            k = min(sentence_pos, key=lambda pos: abs(total - lengths[pos] - target))
+            if total - lengths[k] < target - self.TOLERANCE:
+                break
+            total -= lengths[k]
+            # 앞/뒤 구분자 중 줄바꿈이 더 많은 쪽(문단 경계)을 남기고 하나만 제거
+            before = parts[i][k - 1]
+            after = parts[i][k + 1] if k + 1 < len(parts[i]) else None
+            if after is not None and before.count("\n") > after.count("\n"):
+                del parts[i][k:k + 2]
+            else:
+                del parts[i][k - 1:k + 1]
+            trimmed.add(i)
+
+        if trimmed:
+            self.metrics.incr("length.local_trims")
+            pos = 0
+            rebuilt = []
+            for i, (_, body) in enumerate(sections):
+                start = text.find(body, pos)
+                if start < 0:
+                    continue
+                if i in trimmed:
+                    rebuilt.append(text[pos:start])
+                    rebuilt.append("".join(parts[i]))
+                    pos = start + len(body)
+            rebuilt.append(text[pos:])
+            text = "".join(rebuilt)
+        return text, total - target
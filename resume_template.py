@@ -0,0 +1,149 @@
+"""이력서 템플릿 엔진
+
+섹션 템플릿(Markdown/HTML/텍스트)을 한 번만 파이썬 함수로 컴파일해 두고,
+이력서 dict를 그 함수 하나로 렌더링합니다. 대량 렌더링은 제너레이터로 흘려보냅니다.
+"""
+import html
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# ===== 이력서 구조 정의 =====
+# (필드, 라벨) — 항상 출력
+PERSONAL_FIELDS: List[Tuple[str, str]] = [
+    ("name", "이름"),
+    ("cellphone", "전화번호"),
+    ("email", "이메일"),
+]
+# (필드, 라벨) — 값이 있을 때만 출력
+OPTIONAL_PERSONAL_FIELDS: List[Tuple[str, str]] = [
+    ("address", "주소"),
+]
+# (필드, 아이콘, 제목) — 값이 있을 때만 출력
+RESUME_SECTIONS: List[Tuple[str, str, str]] = [
+    ("education", "🎓", "학력"),
+    ("experience", "🏢", "경력"),
+    ("skills", "💡", "기술 및 역량"),
+    ("certification", "📜", "자격증"),
+    ("language", "🗣️", "어학 능력"),
+    ("awards", "🏆", "수상 경력"),
+    ("activities", "🌍", "대외 활동"),
+    ("portfolio_link", "🔗", "포트폴리오"),
+]
+LINK_FIELDS = {"portfolio_link"}
+
+# ===== 형식별 템플릿 =====
+# {label}/{icon}/{title}은 컴파일 시점에 채워지고, {value}만 렌더링 시점에 치환됩니다.
+FORMAT_TEMPLATES: Dict[str, Dict[str, str]] = {
+    "markdown": {
+        "head": "## 📄 이 력 서\n\n### 👤 개인 정보\n",
+        "personal": "\n- **{label}**: {value}",
+        "personal_end": "\n\n",
+        "section": "\n### {icon} {title}\n\n{value}\n\n\n",
+        "link": "\n### {icon} {title}\n\n- [포트폴리오 링크]({value})\n\n\n",
+        "tail": "",
+    },
+    "html": {
+        "head": '<article class="resume">\n<h2>이 력 서</h2>\n<h3>개인 정보</h3>\n<ul>\n',
+        "personal": "<li><strong>{label}</strong>: {value}</li>\n",
+        "personal_end": "</ul>\n",
+        "section": "<section>\n<h3>{title}</h3>\n<p>{value}</p>\n</section>\n",
+        "link": '<section>\n<h3>{title}</h3>\n<p><a href="{value}">포트폴리오 링크</a></p>\n</section>\n',
+        "tail": "</article>\n",
+    },
+    "text": {
+        "head": "이 력 서\n========\n\n[개인 정보]\n",
+        "personal": "{label}: {value}\n",
+        "personal_end": "",
+        "section": "\n[{title}]\n{value}\n",
+        "link": "\n[{title}]\n{value}\n",
+        "tail": "",
+    },
+}
+
+
+def _escape_html(value) -> str:
+    return html.escape(str(value)).replace("\n", "<br>\n")
+
+
+ESCAPERS: Dict[str, Callable[[object], str]] = {
+    "markdown": str,
+    "html": _escape_html,
+    "text": str,
+}
+
+
+# ===== 컴파일러 =====
+def _split_value(template: str, **names) -> Tuple[str, str]:
+    """템플릿을 {value} 앞/뒤 리터럴로 분리"""
+    before, after = template.split("{value}")
+    return before.format(**names), after.format(**names)
+
+
+def compile_template(fmt: str) -> Callable[[Dict], str]:
+    """형식 템플릿을 단일 렌더 함수로 컴파일"""
+    if fmt not in FORMAT_TEMPLATES:
+        raise ValueError(f"지원하지 않는 형식입니다: {fmt}")
+    tpl = FORMAT_TEMPLATES[fmt]
+
+    lines = ["def render(data):", "    get = data.get", f"    parts = [{tpl['head']!r}]"]
+    for field, label in PERSONAL_FIELDS:
+        before, after = _split_value(tpl["personal"], label=label)
+        lines.append(f"    parts += ({before!r}, esc(get({field!r}) or ''), {after!r})")
+    for field, label in OPTIONAL_PERSONAL_FIELDS:
+        before, after = _split_value(tpl["personal"], label=label)
+        lines.append(f"    value = get({field!r})")
+        lines.append(f"    if value: parts += ({before!r}, esc(value), {after!r})")
+    lines.append(f"    parts.append({tpl['personal_end']!r})")
+    for field, icon, title in RESUME_SECTIONS:
+        key = "link" if field in LINK_FIELDS else "section"
+        before, after = _split_value(tpl[key], icon=icon, title=title)
+        lines.append(f"    value = get({field!r})")
+        lines.append(f"    if value: parts += ({before!r}, esc(value), {after!r})")
+    lines.append(f"    parts.append({tpl['tail']!r})")
+    lines.append("    return ''.join(parts)")
+
+    namespace = {"esc": ESCAPERS[fmt]}
+    exec(compile("\n".join(lines), f"<resume_template:{fmt}>", "exec"), namespace)
+    return namespace["render"]
+
+
+class ResumeTemplateEngine:
+    """형식별 컴파일된 렌더 함수 보관 (최초 사용 시 1회 컴파일)"""
+
+    def __init__(self):
+        self._compiled: Dict[str, Callable[[Dict], str]] = {}
+
+    def renderer(self, fmt: str = "markdown") -> Callable[[Dict], str]:
+        fn = self._compiled.get(fmt)
+        if fn is None:
+            fn = self._compiled[fmt] = compile_template(fmt)
+        return fn
+
+    def render(self, data: Dict, fmt: str = "markdown") -> str:
+        return self.renderer(fmt)(data)
+
+    def render_many(self, records: Iterable[Dict], fmt: str = "markdown") -> Iterator[str]:
+        """대량 렌더링: 입력을 한 건씩 소비하며 결과를 흘려보냄"""
+        return map(self.renderer(fmt), records)
+
+    def render_named(self, records: Iterable[Dict], fmt: str = "markdown",
+                     name_field: str = "name") -> Iterator[Tuple[str, str]]:
+        """(파일명, 문서) 스트림 — exporter.ExportEngine.stream_zip에 그대로 전달 가능"""
+        ext = {"markdown": "md", "html": "html", "text": "txt"}[fmt]
+        render = self.renderer(fmt)
+        for i, record in enumerate(records, 1):
+            stem = str(record.get(name_field) or "resume").replace("/", "_")
+            yield f"{i:06d}_{stem}.{ext}", render(record)
+
+
+_default_engine: Optional[ResumeTemplateEngine] = None
+
+
+def get_engine() -> ResumeTemplateEngine:
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = ResumeTemplateEngine()
+    return _default_engine
+
+
+def render_resume(data: Dict, fmt: str = "markdown") -> str:
+    return get_engine().render(data, fmt)
@@ -0,0 +1,176 @@
+"""유사 자기소개서 인덱스 (MinHash/LSH)
+
+문자 n-gram MinHash 서명을 LSH 밴드 버킷에 색인해, 다른 작성자의 글과 지나치게 겹치는지 빠르게 찾습니다.
+"""
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from text_store import TextStore
+
+
+# ===== 유사 자기소개서 인덱스 (MinHash/LSH) =====
+LSH_NUM_PERM = 128
+LSH_BANDS = 32          # 밴드당 4행 → 유사도 약 0.4 이상부터 후보로 잡힘
+LSH_SHINGLE = 5         # 문자 n-gram 크기
+LSH_INDEX_PATH = os.getenv("COVERLETTER_LSH_PATH", "coverletter_lsh.jsonl")
+SIMILAR_THRESHOLD = 0.5
+LSH_HASH_VERSION = 2    # 해시 함수가 바뀌면 올림 (다른 버전으로 기록된 서명은 비교하지 않음)
+LSH_MAX_ESTIMATE_ERROR = 0.1  # 자가 점검: 추정-실제 자카드 오차 표준편차 허용치 (128개 기준 기대값 약 0.04)
+_PRIME_32 = (1 << 32) - 5
+
+
+class MinHasher:
+    """문자 n-gram 집합의 MinHash 서명 (numpy 벡터 연산)"""
+    def __init__(self, num_perm: int = LSH_NUM_PERM, shingle: int = LSH_SHINGLE, seed: int = 42):
+        rng = np.random.default_rng(seed)
+        # h(x) = (a·x + b) mod p, p < 2^32 이고 x < p 이므로 a·x + b < 2^64 (uint64 오버플로 없음)
+        self.a = rng.integers(1, _PRIME_32, num_perm, dtype=np.uint64)
+        self.b = rng.integers(1, _PRIME_32, num_perm, dtype=np.uint64)
+        self.shingle = shingle
+
+    def grams(self, text: str) -> set:
+        normalized = re.sub(r'[^0-9a-z\uAC00-\uD7A3]', '', text.lower())
+        k = self.shingle
+        return {normalized[i:i + k] for i in range(max(1, len(normalized) - k + 1))}
+
+    def shingles(self, text: str) -> np.ndarray:
+        grams = self.grams(text)
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) % _PRIME_32 for g in grams),
+                           dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text)
+        if hashes.size == 0:
+            return np.full(self.a.shape, 0xFFFFFFFF, dtype=np.uint32)
+        permuted = (np.outer(hashes, self.a) + self.b) % np.uint64(_PRIME_32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def exact_jaccard(self, a: str, b: str) -> float:
+        grams_a, grams_b = self.grams(a), self.grams(b)
+        union = grams_a | grams_b
+        return len(grams_a & grams_b) / len(union) if union else 1.0
+
+    def estimate_error(self, pairs: List[Tuple[str, str]]) -> float:
+        """서명으로 추정한 자카드와 실제 자카드 차이의 표준편차"""
+        errors = [float(np.mean(self.signature(a) == self.signature(b))) - self.exact_jaccard(a, b) for a, b in pairs]
+        return float(np.std(errors)) if errors else 0.0
+
+    def self_check(self, samples: int = 40, seed: int = 7) -> float:
+        """합성 유사 문서 쌍으로 추정 정확도를 점검. 허용치를 넘으면 RuntimeError"""
+        rng = np.random.default_rng(seed)
+        syllables = [chr(code) for code in range(0xAC00, 0xAC00 + 400)]
+        pairs = []
+        for _ in range(samples):
+            base = "".join(rng.choice(syllables, 300))
+            edited = list(base)
+            for i in rng.choice(len(edited), int(rng.integers(5, 60)), replace=False):
+                edited[i] = rng.choice(syllables)
+            pairs.append((base, "".join(edited)))
+        error = self.estimate_error(pairs)
+        if error > LSH_MAX_ESTIMATE_ERROR:
+            raise RuntimeError(f"MinHash 추정 오차가 너무 큽니다 (표준편차 {error:.3f})")
+        return error
+
+
+class LetterSimilarityIndex:
+    """MinHash 서명을 LSH 밴드 버킷에 색인. 추가 전용 JSONL로 저장하고, 새로 붙은 줄만 증분 로드"""
+    def __init__(self, path: str = LSH_INDEX_PATH, num_perm: int = LSH_NUM_PERM, bands: int = LSH_BANDS):
+        self.path = path
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._meta: Dict[str, Dict] = {}
+        self._offset = 0
+        with self._lock:
+            self._sync()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: np.ndarray):
+        raw = signature.reshape(self.bands, self.rows)
+        return [(band, raw[band].tobytes()) for band in range(self.bands)]
+
+    def _insert(self, doc_id: str, signature: np.ndarray, meta: Dict) -> None:
+        if doc_id in self._signatures:
+            return
+        self._signatures[doc_id] = signature
+        self._meta[doc_id] = meta
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(doc_id)
+
+    def _sync(self) -> None:
+        """파일에서 마지막으로 읽은 위치 이후의 완전한 줄만 읽어 반영 (다른 프로세스의 추가분 포함)"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            try:
+                record = json.loads(line)
+                if record.get("hv", 1) != LSH_HASH_VERSION:
+                    continue
+                signature = np.frombuffer(base64.b64decode(record["sig"]), dtype=np.uint32)
+                self._insert(record["id"], signature, record.get("meta", {}))
+            except (ValueError, KeyError):
+                continue
+        self._offset += end
+
+    def add(self, text: str, meta: Dict) -> str:
+        """문서 서명을 색인하고 디스크에 추가. 문서 id(내용 해시) 반환"""
+        doc_id = TextStore.make_key(text)
+        signature = self.hasher.signature(text)
+        with self._lock:
+            self._sync()
+            if doc_id in self._signatures:
+                return doc_id
+            record = {"id": doc_id, "hv": LSH_HASH_VERSION, "sig": base64.b64encode(signature.tobytes()).decode("ascii"), "meta": meta}
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._sync()
+        return doc_id
+
+    def query(self, text: str, exclude_owner: Optional[str] = None,
+              threshold: float = SIMILAR_THRESHOLD, limit: int = 5) -> List[Dict]:
+        """LSH 버킷 후보만 비교해 유사 문서 id와 유사도 반환 (추정 자카드 유사도 내림차순, 메타데이터 제외)"""
+        signature = self.hasher.signature(text)
+        doc_id = TextStore.make_key(text)
+        with self._lock:
+            self._sync()
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            results = []
+            for candidate in candidates:
+                meta = self._meta[candidate]
+                if candidate == doc_id or (exclude_owner and meta.get("owner") == exclude_owner):
+                    continue
+                similarity = float(np.mean(self._signatures[candidate] == signature))
+                if similarity >= threshold:
+                    results.append({"id": candidate, "similarity": similarity})
+        results.sort(key=lambda r: r["similarity"], reverse=True)
+        return results[:limit]
+
+
+def letter_owner(owner_token: str) -> str:
+    """브라우저 소유자 토큰에서 만든 작성자 식별값 (같은 작성자의 글끼리는 중복으로 보지 않음).
+    이력서를 고쳐도 바뀌지 않고, 색인 파일에는 토큰 원문 대신 이 해시만 남음"""
+    return hashlib.blake2b(owner_token.encode("utf-8"), digest_size=8, person=b"lsh-owner").hexdigest()
+
+
+def index_letter(index: LetterSimilarityIndex, owner: str, kind: str, text: str) -> None:
+    # 지원 직무 등 다른 사용자에게 드러날 수 있는 정보는 색인에 남기지 않음
+    index.add(text, {"owner": owner, "kind": kind})
@@ -0,0 +1,58 @@
+"""동일 요청 병합 (single-flight)"""
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional
+
+from metrics import Metrics
+
+
+# ===== 동일 요청 병합 (single-flight) =====
+class _InFlightCall:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """같은 요청이 동시에 들어오면 한 번만 실제 호출하고, 나머지는 그 결과를 함께 받음 (프로세스 공유)"""
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _InFlightCall] = {}
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], temperature: float, max_tokens: int,
+                 credential: str = "") -> str:
+        """같은 자격 증명(API 키)으로 보낸 동일 요청만 병합되도록 키에 자격 증명 해시를 포함"""
+        payload = json.dumps([credential, model, messages, temperature, max_tokens], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def do(self, key: str, fn):
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlightCall()
+
+        if not leader:
+            self.metrics.incr("singleflight.coalesced")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self.metrics.incr("singleflight.executed")
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.event.set()
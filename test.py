@@ -1,33 +1,113 @@
 import os
-import json
 import time
 import re
+import hashlib
+import threading
+import uuid
+import secrets
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 import streamlit as st
-from dataclasses import dataclass
-
-# ===== 데이터 구조 =====
-@dataclass
-class CoverLetterProject:
-    job_title: str
-    jd_text: str
-    resume_text: str
-    questions: str
-    draft: Optional[str] = None
-    refined: Optional[str] = None
-    keywords: Optional[List[str]] = None
-    coverage: Optional[Dict] = None
-    model: str = "gpt-4o-mini"
-    temperature: float = 0.7
-    target_len: int = 800
-    tone: str = "정중하고 간결한"
-    timestamp: float = 0.0
+import streamlit.components.v1 as components
+
+from exporter import EXPORT_FORMATS, ExportDocument, ExportEngine
+from hedging import STAGE_DEADLINES, AttemptCancelled, HedgedExecutor
+from jd_store import CoverageMatcher, JDFingerprintStore
+from job_queue import JOB_PENDING, JobQueue
+from length_control import LengthController
+from metrics import Metrics
+from similarity import LetterSimilarityIndex, index_letter, letter_owner
+from single_flight import SingleFlight
+from text_analysis import TextAnalyzer, join_sections, split_sections
+from text_store import CoverLetterProject, SessionRegistry, get_default_store
+
+# ===== 세션 식별 =====
+def current_session_id() -> str:
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        if ctx is not None:
+            return ctx.session_id
+    except Exception:
+        pass
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
+OWNER_COOKIE = "coverletter_owner"
+OWNER_COOKIE_MAX_AGE = 30 * 24 * 3600
+
+def browser_owner_token() -> str:
+    """브라우저별 무작위 비밀값 (쿠키 보관). 작업 결과 조회 권한과 '내 글' 구분에 사용하며 URL에는 싣지 않음"""
+    token = st.session_state.get("owner_token")
+    if token:
+        return token
+    cookies = getattr(getattr(st, "context", None), "cookies", None) or {}
+    token = cookies.get(OWNER_COOKIE) or ""
+    if not re.fullmatch(r"[0-9a-f]{32}", token):
+        token = secrets.token_hex(16)
+        # 컴포넌트 iframe은 앱과 같은 출처이므로 여기서 설정한 쿠키가 다음 접속 때 st.context.cookies로 전달됨
+        components.html(
+            f"<script>document.cookie = '{OWNER_COOKIE}={token}; path=/; "
+            f"max-age={OWNER_COOKIE_MAX_AGE}; SameSite=Strict';</script>",
+            height=0
+        )
+    st.session_state.owner_token = token
+    return token
+
+# ===== 모델 설정 =====
+AUTO_MODEL = "auto"
+CASCADE_MODELS = ["gpt-4o-mini", "gpt-4o"]  # 저렴한 모델 → 강한 모델 순
+MODEL_OPTIONS = [AUTO_MODEL, "gpt-4o-mini", "gpt-4o", "gpt-4o-2024-08-06"]
+MODEL_LABELS = {AUTO_MODEL: "자동 (gpt-4o-mini 우선, 필요 시 상향)"}
+
+# ===== 프로세스 공유 자원 (재실행 간 유지) =====
+@st.cache_resource
+def get_metrics() -> Metrics:
+    return Metrics()
+
+@st.cache_resource
+def get_single_flight() -> SingleFlight:
+    return SingleFlight(get_metrics())
+
+@st.cache_resource
+def get_hedged_executor() -> HedgedExecutor:
+    return HedgedExecutor(get_metrics())
+
+@st.cache_resource
+def get_length_controller() -> LengthController:
+    return LengthController(get_metrics(), aliases={AUTO_MODEL: CASCADE_MODELS[0]})
+
+@st.cache_resource
+def get_session_registry() -> SessionRegistry:
+    return SessionRegistry()
+
+@st.cache_resource
+def get_jd_store() -> JDFingerprintStore:
+    return JDFingerprintStore(metrics=get_metrics())
+
+@st.cache_resource
+def get_similarity_index() -> LetterSimilarityIndex:
+    index = LetterSimilarityIndex()
+    index.hasher.self_check()  # 해시 함수가 자카드를 제대로 추정하는지 시작 시 한 번 확인
+    return index
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    return JobQueue()
 
 # ===== OpenAI API 래퍼 =====
 class OpenAIClient:
-    def __init__(self):
+    def __init__(self, single_flight: Optional[SingleFlight] = None, executor: Optional[HedgedExecutor] = None,
+                 length_controller: Optional[LengthController] = None):
         self.client = None
+        self.single_flight = single_flight
+        self.executor = executor
+        self.length_controller = length_controller
+        self.last_finish_reason: Optional[str] = None
+        self.last_completion_tokens: Optional[int] = None
+        self.credential_id = ""  # API 키 해시 (요청 병합 범위 구분용, 원문은 보관하지 않음)
+        self._calls = threading.local()  # 스레드별 call_openai 호출 수 (작업 스레드끼리 섞이지 않도록)
         self._initialize_client()
     
     def _initialize_client(self):
@@ -36,6 +116,7 @@ class OpenAIClient:
             api_key = os.getenv("OPENAI_API_KEY") or st.session_state.get("api_key", "")
             if api_key:
                 self.client = OpenAI(api_key=api_key)
+                self.credential_id = hashlib.blake2b(api_key.encode("utf-8"), digest_size=16).hexdigest()
                 self.is_v1 = True
             else:
                 raise Exception("No API key found")
@@ -46,6 +127,7 @@ class OpenAIClient:
                 if api_key:
                     openai.api_key = api_key
                     self.client = openai
+                    self.credential_id = hashlib.blake2b(api_key.encode("utf-8"), digest_size=16).hexdigest()
                     self.is_v1 = False
                 else:
                     raise Exception("No API key found")
@@ -53,102 +135,111 @@ class OpenAIClient:
                 st.error(f"OpenAI 클라이언트 초기화 실패: {e}")
                 self.client = None
     
-    def call_openai(self, model: str, messages: List[Dict], temperature: float = 0.7, max_tokens: int = 1200) -> str:
+    def call_count(self) -> int:
+        """현재 스레드에서 지금까지 call_openai를 호출한 횟수"""
+        return getattr(self._calls, "count", 0)
+    
+    def call_openai(self, model: str, messages: List[Dict], temperature: float = 0.7, max_tokens: int = 1200,
+                    stage: str = "default") -> str:
         if not self.client:
             raise Exception("OpenAI 클라이언트가 초기화되지 않았습니다.")
         
+        self._calls.count = self.call_count() + 1
         try:
-            if self.is_v1:
-                resp = self.client.chat.completions.create(
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
+            if self.single_flight:
+                key = SingleFlight.make_key(model, messages, temperature, max_tokens, self.credential_id)
+                content, self.last_finish_reason, self.last_completion_tokens = self.single_flight.do(
+                    key, lambda: self._request(model, messages, temperature, max_tokens, stage)
                 )
-                return resp.choices[0].message.content
             else:
-                resp = self.client.ChatCompletion.create(
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
+                content, self.last_finish_reason, self.last_completion_tokens = self._request(
+                    model, messages, temperature, max_tokens, stage
                 )
-                return resp["choices"][0]["message"]["content"]
+            if self.length_controller and self.last_completion_tokens:
+                self.length_controller.observe(model, content, self.last_completion_tokens)
+            return content
         except Exception as e:
-            if "rate limit" in str(e).lower():
+            if isinstance(e, TimeoutError) or "timed out" in str(e).lower():
+                raise Exception("API 응답 시간 초과. 잠시 후 다시 시도해주세요.")
+            elif "rate limit" in str(e).lower():
                 raise Exception("API 호출 한도 초과. 잠시 후 다시 시도해주세요.")
             elif "invalid api key" in str(e).lower():
                 raise Exception("유효하지 않은 API 키입니다.")
             else:
                 raise Exception(f"API 호출 실패: {str(e)}")
-
-# ===== 유틸리티 함수들 =====
-class TextAnalyzer:
-    @staticmethod
-    def count_korean_chars(text: str) -> int:
-        """한글 문자 수 계산"""
-        return len(re.sub(r'[^\uAC00-\uD7A3]', '', text))
-    
-    @staticmethod
-    def analyze_readability(text: str) -> Dict:
-        """가독성 분석"""
-        sentences = re.split(r'[.!?]\s*', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
-        if not sentences:
-            return {"avg_sentence_length": 0, "long_sentences": 0, "readability_score": 0}
-        
-        sentence_lengths = [len(s) for s in sentences]
-        avg_length = sum(sentence_lengths) / len(sentence_lengths)
-        long_sentences = sum(1 for length in sentence_lengths if length > 100)
-        
-        # 간단한 가독성 점수 (100점 만점)
-        readability_score = max(0, min(100, 100 - (avg_length - 50) * 2 - long_sentences * 10))
-        
-        return {
-            "avg_sentence_length": round(avg_length, 1),
-            "long_sentences": long_sentences,
-            "readability_score": round(readability_score, 1),
-            "total_sentences": len(sentences)
-        }
     
-    @staticmethod
-    def detect_cliche_advanced(text: str) -> Dict:
-        """고도화된 클리셰 감지"""
-        cliche_patterns = {
-            "과도한 형용사": ["매우", "정말", "너무", "굉장히", "엄청", "최고의", "완벽한"],
-            "뻔한 표현": ["열정적으로", "끊임없이 노력", "항상 최선", "도전정신", "책임감", "소통능력"],
-            "추상적 표현": ["시너지", "윈윈", "파라다임", "벤치마킹", "글로벌 마인드"],
-            "과장 표현": ["혁신적인", "차별화된", "독창적인", "탁월한", "뛰어난"]
-        }
-        
-        detected = {}
-        total_cliche = 0
-        
-        for category, words in cliche_patterns.items():
-            found = []
-            for word in words:
-                count = text.count(word)
-                if count > 0:
-                    found.append(f"{word}({count})")
-                    total_cliche += count
-            detected[category] = found
-        
-        return {
-            "categories": detected,
-            "total_cliche_count": total_cliche,
-            "cliche_density": round(total_cliche / max(1, len(text)) * 1000, 2)  # 1000자당 클리셰 수
-        }
+    def _request(self, model: str, messages: List[Dict], temperature: float, max_tokens: int,
+                 stage: str = "default") -> Tuple[str, Optional[str], Optional[int]]:
+        """실제 API 호출 → (본문, finish_reason, 완성 토큰 수). 단계별 데드라인 적용, v1은 스트리밍 + 헤징"""
+        timeout = STAGE_DEADLINES.get(stage, STAGE_DEADLINES["default"])
+        if self.is_v1:
+            attempt = lambda cancel, on_first_token, remaining: self._stream_attempt(
+                model, messages, temperature, max_tokens, cancel, on_first_token, remaining
+            )
+            if self.executor:
+                return self.executor.run(attempt, model, stage)
+            return attempt(threading.Event(), lambda: None, timeout)
+        else:
+            resp = self.client.ChatCompletion.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                request_timeout=timeout,
+            )
+            usage = resp.get("usage") or {}
+            return (resp["choices"][0]["message"]["content"], resp["choices"][0].get("finish_reason"),
+                    usage.get("completion_tokens"))
+    
+    def _stream_attempt(self, model: str, messages: List[Dict], temperature: float, max_tokens: int,
+                        cancel: threading.Event, on_first_token, timeout: float) -> Tuple[str, Optional[str], Optional[int]]:
+        """스트리밍 호출 1회. 청크마다 취소 여부를 확인하고 취소되면 연결을 닫음"""
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=timeout,
+        )
+        parts: List[str] = []
+        finish_reason = None
+        completion_tokens = None
+        try:
+            for chunk in stream:
+                if cancel.is_set():
+                    raise AttemptCancelled()
+                if getattr(chunk, "usage", None):
+                    completion_tokens = chunk.usage.completion_tokens
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta and choice.delta.content:
+                    on_first_token()
+                    parts.append(choice.delta.content)
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+        finally:
+            stream.close()
+        return "".join(parts), finish_reason, completion_tokens
 
 class KeywordAnalyzer:
-    def __init__(self, openai_client: OpenAIClient):
+    def __init__(self, openai_client: OpenAIClient, jd_store: Optional[JDFingerprintStore] = None):
         self.client = openai_client
+        self.jd_store = jd_store
     
-    def extract_keywords(self, text: str, top_k: int = 20) -> List[str]:
-        """키워드 추출 (개선된 버전)"""
+    def extract_keywords(self, text: str, top_k: int = 20, raise_errors: bool = False) -> List[str]:
+        """키워드 추출 (개선된 버전). raise_errors=True면 실패를 화면 대신 호출자에게 전달 (워커 스레드용)"""
         if not text.strip():
             return []
         
+        # 동일/유사 공고가 이미 분석되었으면 로컬 조회로 대체
+        if self.jd_store is not None:
+            cached = self.jd_store.lookup_keywords(text, top_k)
+            if cached is not None:
+                return cached
+        
         prompt = f"""
         아래 채용 공고/직무 설명서를 분석하여 중요한 키워드를 추출해주세요.
         
@@ -168,11 +259,15 @@ class KeywordAnalyzer:
             response = self.client.call_openai("gpt-4o-mini", [
                 {"role": "system", "content": "당신은 채용 전문가입니다. 정확하고 구체적인 키워드만 추출하세요."},
                 {"role": "user", "content": prompt}
-            ], temperature=0.1, max_tokens=400)
+            ], temperature=0.1, max_tokens=400, stage="keywords")
             
-            keywords = [kw.strip().strip(".,·") for kw in response.split(",") if kw.strip()]
-            return keywords[:top_k]
+            keywords = [kw.strip().strip(".,·") for kw in response.split(",") if kw.strip()][:top_k]
+            if self.jd_store is not None and keywords:
+                self.jd_store.remember(text, keywords, top_k)
+            return keywords
         except Exception as e:
+            if raise_errors:
+                raise
             st.error(f"키워드 추출 실패: {e}")
             return []
     
@@ -181,39 +276,134 @@ class KeywordAnalyzer:
         if not draft or not keywords:
             return {"covered": [], "missing": keywords, "coverage": 0.0, "partial_matches": []}
         
-        draft_lower = draft.lower()
-        covered = []
-        partial_matches = []
-        missing = []
-        
-        for keyword in keywords:
-            kw_lower = keyword.lower()
-            if kw_lower in draft_lower:
-                covered.append(keyword)
-            elif any(word in draft_lower for word in kw_lower.split()):
-                partial_matches.append(keyword)
-            else:
-                missing.append(keyword)
-        
-        coverage = round(100.0 * len(covered) / max(1, len(keywords)), 1)
-        partial_coverage = round(100.0 * len(partial_matches) / max(1, len(keywords)), 1)
-        
-        return {
-            "covered": covered,
-            "partial_matches": partial_matches,
-            "missing": missing,
-            "coverage": coverage,
-            "partial_coverage": partial_coverage,
-            "total_coverage": coverage + partial_coverage * 0.5
+        matcher = self.jd_store.matcher(keywords) if self.jd_store is not None else CoverageMatcher(keywords)
+        return matcher.analyze(draft)
+
+class CascadeRouter:
+    """저렴한 모델로 먼저 생성하고, 로컬 품질 검사를 통과하지 못한 문항만 강한 모델로 재작성"""
+    ENDINGS = (".", "!", "?", "…", "다", "요", "\"", "'", "」", "』", ")")
+    LENGTH_TOLERANCE = {"draft": 0.6, "refine": 0.25}  # 문항별 목표 대비 허용 비율
+    MIN_COVERAGE = 40.0        # 전체 문서 키워드 종합 커버리지(%)
+    MAX_CLICHE_DENSITY = 5.0   # 1000자당 클리셰 수
+    
+    def __init__(self, openai_client: OpenAIClient, keyword_analyzer: KeywordAnalyzer, metrics: Metrics):
+        self.client = openai_client
+        self.keyword_analyzer = keyword_analyzer
+        self.metrics = metrics
+    
+    def inspect(self, sections: List[Tuple[str, str]], project: CoverLetterProject,
+                stage: str, truncated: bool) -> Dict[int, List[str]]:
+        """문항 인덱스 → 실패 사유 목록"""
+        failures: Dict[int, List[str]] = {}
+        answer_idx = [i for i, (header, _) in enumerate(sections) if header] or list(range(len(sections)))
+        section_target = project.target_len / max(1, len(answer_idx))
+        tolerance = self.LENGTH_TOLERANCE[stage]
+        
+        # 잘림: API가 길이 초과로 종료했거나 마지막 문장이 끝나지 않음
+        last_body = sections[-1][1].rstrip("* \n")
+        if truncated or (last_body and not last_body.endswith(self.ENDINGS)):
+            failures.setdefault(len(sections) - 1, []).append("truncated")
+        
+        for i in answer_idx:
+            body = sections[i][1]
+            chars = TextAnalyzer.count_korean_chars(body)
+            if abs(chars - section_target) > section_target * tolerance:
+                failures.setdefault(i, []).append("length")
+            if TextAnalyzer.detect_cliche_advanced(body)["cliche_density"] > self.MAX_CLICHE_DENSITY:
+                failures.setdefault(i, []).append("cliche")
+        
+        # 키워드 커버리지는 문서 단위로 보고, 미달 시 커버리지가 가장 낮은 문항을 지목
+        if project.keywords:
+            full_text = join_sections(sections)
+            coverage = self.keyword_analyzer.analyze_coverage(full_text, project.keywords)
+            if coverage["total_coverage"] < self.MIN_COVERAGE:
+                worst = min(answer_idx, key=lambda i: self.keyword_analyzer.analyze_coverage(
+                    sections[i][1], project.keywords)["total_coverage"])
+                failures.setdefault(worst, []).append("coverage")
+        return failures
+    
+    def generate(self, messages: List[Dict], project: CoverLetterProject, stage: str,
+                 context: str, temperature: float, max_tokens: int) -> str:
+        cheap, strong = CASCADE_MODELS[0], CASCADE_MODELS[-1]
+        self.metrics.incr(f"router.{stage}.requests")
+        self.metrics.incr(f"model_calls.{cheap}")
+        text = self.client.call_openai(cheap, messages, temperature=temperature, max_tokens=max_tokens, stage=stage)
+        truncated = self.client.last_finish_reason == "length"
+        
+        sections = split_sections(text)
+        failures = self.inspect(sections, project, stage, truncated)
+        self.metrics.incr(f"router.{stage}.sections", len(sections))
+        if not failures:
+            return text
+        
+        self.metrics.incr(f"router.{stage}.escalated")
+        for reasons in failures.values():
+            for reason in reasons:
+                self.metrics.incr(f"router.fail.{reason}")
+        
+        # 제목 없는 단일 섹션이면 전체를 강한 모델로 재생성
+        if len(sections) == 1 and not sections[0][0]:
+            self.metrics.incr(f"router.{stage}.escalated_sections")
+            self.metrics.incr(f"model_calls.{strong}")
+            return self.client.call_openai(strong, messages, temperature=temperature, max_tokens=max_tokens, stage=stage)
+        
+        answer_count = sum(1 for header, _ in sections if header) or 1
+        for i, reasons in sorted(failures.items()):
+            header, body = sections[i]
+            sections[i] = (header, self._rewrite_section(
+                header, body, reasons, project, context, project.target_len // answer_count, temperature
+            ))
+            self.metrics.incr(f"router.{stage}.escalated_sections")
+            self.metrics.incr(f"model_calls.{strong}")
+        return join_sections(sections)
+    
+    def _rewrite_section(self, header: str, body: str, reasons: List[str], project: CoverLetterProject,
+                         context: str, section_target: int, temperature: float) -> str:
+        reason_text = {
+            "truncated": "답변이 중간에 끊김",
+            "length": f"길이가 목표(약 {section_target}자)와 크게 다름",
+            "cliche": "상투적 표현이 많음",
+            "coverage": "채용공고 핵심 키워드 반영 부족",
         }
+        problems = "\n".join(f"- {reason_text[r]}" for r in reasons)
+        keywords = ", ".join(project.keywords or [])
+        prompt = f"""
+        아래 자기소개서의 한 문항 답변을 다시 작성해주세요.
+        
+        문항: {header.strip('*# ')}
+        목표 길이: 약 {section_target}자
+        톤: {project.tone}
+        핵심 키워드: {keywords or '없음'}
+        
+        발견된 문제:
+        {problems}
+        
+        참고 정보:
+        {context}
+        
+        기존 답변:
+        {body}
+        
+        문항 제목 없이 답변 본문만 출력하세요.
+        """
+        response = self.client.call_openai(CASCADE_MODELS[-1], [
+            {"role": "system", "content": "당신은 전문 자기소개서 작성 컨설턴트입니다."},
+            {"role": "user", "content": prompt}
+        ], temperature=temperature, max_tokens=max(400, section_target * 2), stage="section")
+        return response.strip()
 
 class CoverLetterGenerator:
-    def __init__(self, openai_client: OpenAIClient):
+    def __init__(self, openai_client: OpenAIClient, router: Optional[CascadeRouter] = None,
+                 length_controller: Optional[LengthController] = None):
         self.client = openai_client
+        self.router = router
+        self.length = length_controller or LengthController(Metrics())
     
     def generate_draft(self, project: CoverLetterProject) -> str:
         """초안 생성"""
         context = self._build_context(project)
+        # 초안은 보정 여지를 두고 목표보다 약간 길게
+        section_guide = ", ".join(f"{q[:15]}… 약 {int(n * 1.2)}자" for q, n in self.length.section_targets(project))
         
         prompt = f"""
         다음 정보를 바탕으로 한국어 자기소개서를 작성해주세요.
@@ -227,6 +417,7 @@ class CoverLetterGenerator:
         4. {project.tone} 톤 유지
         5. 문항 제목을 **굵게** 표시
         6. 채용공고의 핵심 키워드 자연스럽게 포함
+        7. 문항별 분량: {section_guide}
         
         금지사항:
         - 일반적이고 추상적인 표현 남발
@@ -234,25 +425,29 @@ class CoverLetterGenerator:
         - 타인의 성과 도용
         """
         
+        messages = [
+            {"role": "system", "content": "당신은 전문 자기소개서 작성 컨설턴트입니다."},
+            {"role": "user", "content": prompt}
+        ]
+        
         try:
-            response = self.client.call_openai(project.model, [
-                {"role": "system", "content": "당신은 전문 자기소개서 작성 컨설턴트입니다."},
-                {"role": "user", "content": prompt}
-            ], temperature=project.temperature, max_tokens=1500)
-            
-            return response
+            max_tokens = self.length.max_tokens(project.model, int(project.target_len * 1.2))
+            return self._call(messages, project, "draft", context, project.temperature, max_tokens)
         except Exception as e:
             raise Exception(f"초안 생성 실패: {e}")
     
     def refine_text(self, text: str, project: CoverLetterProject) -> str:
-        """텍스트 정제 및 길이 조정"""
+        """텍스트 정제 및 길이 조정 (로컬 보정으로 부족할 때만 추가 호출 1회)"""
         current_chars = TextAnalyzer.count_korean_chars(text)
+        section_guide = "\n        ".join(f"- {q}: 약 {n}자" for q, n in self.length.section_targets(project))
         
         prompt = f"""
         다음 자기소개서를 개선해주세요.
         
         현재 길이: {current_chars}자
         목표 길이: {project.target_len}자 (±50자)
+        문항별 목표:
+        {section_guide}
         톤: {project.tone}
         
         개선 사항:
@@ -266,16 +461,51 @@ class CoverLetterGenerator:
         {text}
         """
         
+        messages = [
+            {"role": "system", "content": "당신은 전문 에디터입니다. 정확한 길이 조정과 품질 향상을 동시에 수행합니다."},
+            {"role": "user", "content": prompt}
+        ]
+        
         try:
-            response = self.client.call_openai(project.model, [
-                {"role": "system", "content": "당신은 전문 에디터입니다. 정확한 길이 조정과 품질 향상을 동시에 수행합니다."},
-                {"role": "user", "content": prompt}
-            ], temperature=0.4, max_tokens=1200)
+            calls_before = self.client.call_count()
+            context = self._build_context(project)
+            max_tokens = self.length.max_tokens(project.model, project.target_len)
+            refined = self._call(messages, project, "refine", context, 0.4, max_tokens)
+            
+            refined, gap = self.length.fit(refined, project.target_len)
+            if abs(gap) > LengthController.TOLERANCE:
+                # 로컬 보정으로 못 맞춘 경우에만 차이를 명시해 한 번 더 요청
+                direction = "늘려" if gap < 0 else "줄여"
+                correction = [
+                    *messages,
+                    {"role": "assistant", "content": refined},
+                    {"role": "user", "content": (
+                        f"현재 {project.target_len + gap}자입니다. 내용과 문항 구성은 유지하면서 "
+                        f"약 {abs(gap)}자 {direction} {project.target_len}자(±50자)로 맞춘 전체 글만 다시 출력하세요."
+                    )},
+                ]
+                refined = self._call(correction, project, "refine", context, 0.3,
+                                     self.length.max_tokens(project.model, project.target_len))
+                self.length.metrics.incr("length.corrections")
+                refined, gap = self.length.fit(refined, project.target_len)
             
-            return response
+            self.length.metrics.incr("length.letters")
+            # 자동(캐스케이드) 모드는 문항별로 여러 번 호출하므로 실제 호출 수로 집계
+            self.length.metrics.incr("length.calls", self.client.call_count() - calls_before)
+            if abs(gap) <= LengthController.TOLERANCE:
+                self.length.metrics.incr("length.on_target")
+            return refined
         except Exception as e:
             raise Exception(f"텍스트 정제 실패: {e}")
     
+    def _call(self, messages: List[Dict], project: CoverLetterProject, stage: str,
+              context: str, temperature: float, max_tokens: int) -> str:
+        """자동 모드면 캐스케이드 라우터, 아니면 선택한 모델로 직접 호출"""
+        if project.model == AUTO_MODEL and self.router:
+            return self.router.generate(messages, project, stage, context, temperature, max_tokens)
+        return self.client.call_openai(project.model, messages, temperature=temperature, max_tokens=max_tokens,
+                                       stage=stage)
+    
     def _build_context(self, project: CoverLetterProject) -> str:
         """컨텍스트 구성"""
         context_parts = []
@@ -294,6 +524,76 @@ class CoverLetterGenerator:
         
         return "\n\n".join(context_parts)
 
+# ===== 백그라운드 생성 작업 =====
+JOB_POLL_INTERVAL = 1.5
+JOB_LABELS = {
+    "draft": "📄 초안 생성",
+    "refine": "✨ 길이/톤 보정",
+    "all": "🎯 전체 생성",
+    "keywords": "🔍 키워드 분석",
+}
+
+def run_generation_job(kind: str, project: CoverLetterProject, generator: CoverLetterGenerator,
+                       keyword_analyzer: KeywordAnalyzer,
+                       similarity_index: Optional[LetterSimilarityIndex] = None,
+                       metrics: Optional[Metrics] = None, owner: str = "") -> Dict:
+    """워커 스레드에서 실행되는 생성 파이프라인 (Streamlit API 호출 금지). 결과는 프로젝트 필드 갱신분"""
+    updates: Dict = {}
+    errors: List[str] = []
+    
+    def index(kind_: str, text: str) -> None:
+        # 유사 글 색인은 부가 기능이므로 실패해도 생성 결과는 그대로 반환하고 지표로만 집계
+        if similarity_index is None:
+            return
+        try:
+            index_letter(similarity_index, owner, kind_, text)
+        except Exception:
+            if metrics is not None:
+                metrics.incr("similarity_index.errors")
+    
+    def extract_keywords() -> bool:
+        try:
+            project.keywords = keyword_analyzer.extract_keywords(project.jd_text, raise_errors=True)
+            updates["keywords"] = project.keywords
+            return True
+        except Exception as e:
+            errors.append(f"키워드 분석 실패: {e}")
+            return False
+    
+    # 자동 모드 전체 생성은 라우터가 초안부터 키워드 커버리지를 검사하도록 키워드를 먼저 추출
+    keywords_ready: Optional[bool] = None
+    if kind == "all" and project.model == AUTO_MODEL and project.jd_text:
+        keywords_ready = extract_keywords()
+    
+    # 초안 생성 (실패 시 작업 전체 실패)
+    if kind in ("draft", "all"):
+        project.draft = generator.generate_draft(project)
+        project.timestamp = time.time()
+        updates.update(draft=project.draft, timestamp=project.timestamp)
+        index("draft", project.draft)
+    
+    # 길이/톤 보정
+    if kind in ("refine", "all") and project.draft:
+        try:
+            project.refined = generator.refine_text(project.draft, project)
+            updates["refined"] = project.refined
+            index("refined", project.refined)
+        except Exception as e:
+            errors.append(f"보정 실패: {e}")
+    
+    # 키워드 분석
+    if kind in ("keywords", "all") and project.jd_text:
+        if keywords_ready is None:
+            keywords_ready = extract_keywords()
+        if keywords_ready and (project.refined or project.draft):
+            try:
+                text_to_analyze = project.refined or project.draft
+                updates["coverage"] = keyword_analyzer.analyze_coverage(text_to_analyze, project.keywords)
+            except Exception as e:
+                errors.append(f"키워드 분석 실패: {e}")
+    
+    return {"updates": updates, "errors": errors}
+
 # ===== Streamlit 앱 =====
 def initialize_session_state():
     """세션 상태 초기화"""
@@ -302,12 +602,20 @@ def initialize_session_state():
         "openai_client": None,
         "keyword_analyzer": None,
         "generator": None,
-        "api_key": ""
+        "api_key": "",
+        "active_job": None
     }
     
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
+    
+    browser_owner_token()
+    
+    # 세션 활동 기록 및 유휴 세션 정리
+    registry = get_session_registry()
+    registry.touch(current_session_id(), st.session_state.project)
+    registry.sweep()
 
 def setup_sidebar():
     """사이드바 설정"""
@@ -323,7 +631,10 @@ def setup_sidebar():
         
         # 모델 설정
         project = st.session_state.project
-        project.model = st.selectbox("모델", ["gpt-4o-mini", "gpt-4o", "gpt-4o-2024-08-06"], index=0)
+        project.model = st.selectbox(
+            "모델", MODEL_OPTIONS, index=MODEL_OPTIONS.index("gpt-4o-mini"),
+            format_func=lambda model: MODEL_LABELS.get(model, model)
+        )
         project.temperature = st.slider("창의성 (temperature)", 0.0, 1.2, 0.7, 0.1)
         project.target_len = st.number_input("목표 글자수(한글)", 200, 3000, 800, 50)
         project.tone = st.selectbox("톤/스타일", [
@@ -335,16 +646,79 @@ def setup_sidebar():
         with st.expander("🔧 고급 옵션"):
             show_analysis = st.checkbox("상세 분석 표시", True)
             auto_save = st.checkbox("자동 저장", False)
+        
+        render_metrics()
             
         return show_analysis, auto_save
 
+def render_metrics():
+    """운영 지표 표시"""
+    metrics = get_metrics()
+    with st.expander("📈 운영 지표"):
+        for stage, label in (("draft", "초안"), ("refine", "보정")):
+            requests = int(metrics.get(f"router.{stage}.requests"))
+            if requests:
+                rate = metrics.ratio(f"router.{stage}.escalated", f"router.{stage}.requests")
+                st.metric(f"{label} 상향 비율", f"{rate * 100:.1f}%", f"{requests}건 중", delta_color="off")
+        calls = {name.split(".", 1)[1]: int(count) for name, count in metrics.snapshot().items()
+                 if name.startswith("model_calls.")}
+        if calls:
+            st.caption("모델 호출 수: " + ", ".join(f"{model} {count}회" for model, count in calls.items()))
+        coalesced = int(metrics.get("singleflight.coalesced"))
+        executed = int(metrics.get("singleflight.executed"))
+        if executed:
+            st.caption(f"실제 API 호출 {executed}회 · 동일 요청 병합 {coalesced}회")
+        hedged_requests = int(metrics.get("hedge.requests"))
+        if hedged_requests:
+            hedge_rate = metrics.ratio("hedge.sent", "hedge.requests")
+            st.caption(
+                f"헤징 {hedge_rate * 100:.1f}% ({int(metrics.get('hedge.sent'))}/{hedged_requests}) · "
+                f"복제 요청 승리 {int(metrics.get('hedge.won'))}회 · 절약 추정 {metrics.get('hedge.saved_seconds'):.1f}초 · "
+                f"시간 초과 {int(metrics.get('deadline.exceeded'))}회"
+            )
+        letters = int(metrics.get("length.letters"))
+        if letters:
+            st.caption(
+                f"보정 1건당 평균 호출 {metrics.ratio('length.calls', 'length.letters'):.2f}회 · "
+                f"목표 길이 적중 {metrics.ratio('length.on_target', 'length.letters') * 100:.0f}% · "
+                f"로컬 보정 {int(metrics.get('length.local_trims'))}회"
+            )
+        jd_hits = int(metrics.get("jd_store.hits"))
+        jd_lookups = jd_hits + int(metrics.get("jd_store.misses"))
+        if jd_lookups:
+            st.caption(f"공고 키워드 재사용 {jd_hits}/{jd_lookups}회 (저장된 공고 {len(get_jd_store())}건)")
+        index_errors = int(metrics.get("similarity_index.errors"))
+        if index_errors:
+            st.caption(f"유사 글 색인 실패 {index_errors}회")
+        if not calls and not executed:
+            st.caption("아직 기록된 지표가 없습니다.")
+    
+    with st.expander("🧠 메모리"):
+        report = st.session_state.project.memory_report()
+        st.metric("이 세션 사용량", f"{report['total_bytes'] / 1024:.1f} KB",
+                  f"원문 {report['raw_text_bytes'] / 1024:.1f} KB", delta_color="off")
+        st.caption(f"레코드 {report['record_bytes']:,} B · 공유 텍스트 지분 {report['shared_text_bytes']:,} B")
+        store = get_default_store().stats()
+        registry = get_session_registry()
+        st.caption(
+            f"공유 저장소: 텍스트 {store['entries']}개 / 참조 {store['refs']}개, "
+            f"{store['stored_bytes'] / 1024:.1f} KB (원문 {store['raw_bytes'] / 1024:.1f} KB)"
+        )
+        st.caption(f"활성 세션 {registry.active_sessions()}개 · 디스크 이관 {registry.evicted}회 · 이관 파일 삭제 {registry.purged}건")
+
 def initialize_clients():
     """클라이언트 초기화"""
     if st.session_state.openai_client is None:
         try:
-            st.session_state.openai_client = OpenAIClient()
-            st.session_state.keyword_analyzer = KeywordAnalyzer(st.session_state.openai_client)
-            st.session_state.generator = CoverLetterGenerator(st.session_state.openai_client)
+            st.session_state.openai_client = OpenAIClient(
+                get_single_flight(), get_hedged_executor(), get_length_controller()
+            )
+            st.session_state.keyword_analyzer = KeywordAnalyzer(st.session_state.openai_client, get_jd_store())
+            st.session_state.generator = CoverLetterGenerator(
+                st.session_state.openai_client,
+                CascadeRouter(st.session_state.openai_client, st.session_state.keyword_analyzer, get_metrics()),
+                get_length_controller()
+            )
         except Exception as e:
             st.error(f"클라이언트 초기화 실패: {e}")
             return False
@@ -418,48 +792,97 @@ def render_generation_buttons():
     
     return generate_draft, refine_text, generate_all, analyze_keywords
 
-def process_generation(generate_draft, refine_text, generate_all, analyze_keywords):
-    """생성 프로세스 처리"""
+def resume_active_job():
+    """URL에 남은 작업 id로 재접속한 경우 이어받기 (같은 브라우저에서 등록한 작업만)"""
+    job_id = st.query_params.get("job")
+    if not job_id or st.session_state.active_job == job_id:
+        return
+    job = get_job_queue().get(job_id, browser_owner_token())
+    if job is None:
+        del st.query_params["job"]
+        return
+    st.session_state.active_job = job_id
+
+def process_generation(generate_draft, refine_text, generate_all, analyze_keywords) -> bool:
+    """생성 작업을 백그라운드 큐에 등록하고 진행 상태를 표시. 진행 중이면 True"""
     project = st.session_state.project
     
     if not initialize_clients():
-        return
+        return False
     
-    # 초안 생성
-    if generate_draft or generate_all:
-        with st.spinner("📝 초안을 생성하고 있습니다..."):
-            try:
-                project.draft = st.session_state.generator.generate_draft(project)
-                project.timestamp = time.time()
-                st.success("✅ 초안 생성 완료!")
-            except Exception as e:
-                st.error(f"❌ 초안 생성 실패: {e}")
-                return
+    job_queue = get_job_queue()
     
-    # 길이/톤 보정
-    if (refine_text or generate_all) and project.draft:
-        with st.spinner("✨ 텍스트를 정제하고 있습니다..."):
-            try:
-                project.refined = st.session_state.generator.refine_text(project.draft, project)
-                st.success("✅ 보정 완료!")
-            except Exception as e:
-                st.error(f"❌ 보정 실패: {e}")
+    kind = None
+    if generate_all:
+        kind = "all"
+    elif generate_draft:
+        kind = "draft"
+    elif refine_text and project.draft:
+        kind = "refine"
+    elif analyze_keywords and project.jd_text:
+        kind = "keywords"
     
-    # 키워드 분석
-    if (analyze_keywords or generate_all) and project.jd_text:
-        with st.spinner("🔍 키워드를 분석하고 있습니다..."):
-            try:
-                project.keywords = st.session_state.keyword_analyzer.extract_keywords(project.jd_text)
-                
-                if project.refined or project.draft:
-                    text_to_analyze = project.refined or project.draft
-                    project.coverage = st.session_state.keyword_analyzer.analyze_coverage(
-                        text_to_analyze, project.keywords
-                    )
-                
-                st.success("✅ 키워드 분석 완료!")
-            except Exception as e:
-                st.error(f"❌ 키워드 분석 실패: {e}")
+    if kind:
+        owner = browser_owner_token()
+        active = job_queue.get(st.session_state.active_job, owner) if st.session_state.active_job else None
+        if active and active["status"] in JOB_PENDING:
+            st.warning(f"⏳ 진행 중인 작업({JOB_LABELS[active['kind']]})이 끝난 뒤 다시 시도해주세요.")
+        else:
+            # 워커 스레드에서는 session_state에 접근할 수 없으므로 필요한 객체를 미리 캡처
+            snapshot = project.copy()
+            generator = st.session_state.generator
+            keyword_analyzer = st.session_state.keyword_analyzer
+            similarity_index = get_similarity_index()
+            metrics = get_metrics()
+            author = letter_owner(owner)
+            job_id = job_queue.submit(kind, owner, lambda: run_generation_job(
+                kind, snapshot, generator, keyword_analyzer, similarity_index, metrics, author
+            ))
+            st.session_state.active_job = job_id
+            st.query_params["job"] = job_id
+    
+    return poll_active_job()
+
+def poll_active_job() -> bool:
+    """작업 상태 확인 및 완료 결과 반영. 진행 중이면 True"""
+    job_id = st.session_state.active_job
+    if not job_id:
+        return False
+    
+    job_queue = get_job_queue()
+    owner = browser_owner_token()
+    job = job_queue.get(job_id, owner)
+    if job is None:
+        st.session_state.active_job = None
+        return False
+    
+    label = JOB_LABELS.get(job["kind"], job["kind"])
+    if job["status"] in JOB_PENDING:
+        elapsed = time.time() - job["created"]
+        state = "대기 중" if job["status"] == "queued" else "진행 중"
+        st.info(f"⏳ {label} {state}... ({elapsed:.0f}초 경과) — 페이지를 조작하거나 새로고침해도 작업은 계속됩니다.")
+        return True
+    
+    project = st.session_state.project
+    if job["status"] == "done":
+        result = job["result"] or {}
+        for field, value in result.get("updates", {}).items():
+            setattr(project, field, value)
+        errors = result.get("errors", [])
+        for error in errors:
+            st.error(f"❌ {error}")
+        if errors:
+            st.warning(f"⚠️ {label}이(가) 일부 단계 실패로 끝났습니다.")
+        else:
+            st.success(f"✅ {label} 완료!")
+    else:
+        st.error(f"❌ {label} 실패: {job['error']}")
+    
+    job_queue.discard(job_id, owner)
+    st.session_state.active_job = None
+    if "job" in st.query_params:
+        del st.query_params["job"]
+    return False
 
 def render_results():
     """결과 렌더링"""
@@ -570,9 +993,56 @@ def render_analysis(show_analysis):
     for category, items in cliche_analysis['categories'].items():
         if items:
             st.warning(f"**{category}**: {', '.join(items)}")
+    
+    # 유사 자기소개서 (다른 지원자 문서와의 중복도)
+    st.subheader("🔁 유사 자기소개서")
+    index = get_similarity_index()
+    similar = index.query(text_to_analyze, exclude_owner=letter_owner(browser_owner_token()))
+    if similar:
+        # 다른 지원자의 직무/작성 시점 등은 노출하지 않고 건수와 유사도만 표시
+        st.error(
+            f"⚠️ 다른 지원자의 자기소개서와 매우 유사한 문서가 {len(similar)}건 있습니다. "
+            f"(최고 유사도 {similar[0]['similarity'] * 100:.0f}%)"
+        )
+    else:
+        st.success(f"✅ 유사한 자기소개서가 없습니다. (색인된 문서 {len(index):,}건)")
+
+@st.cache_resource
+def get_export_engine() -> ExportEngine:
+    """프로세스 공유 내보내기 엔진 (내용 해시 캐시)"""
+    return ExportEngine()
+
+def build_export_document(project: CoverLetterProject, export_text: str) -> ExportDocument:
+    """내보내기용 문서 구성"""
+    written_at = datetime.fromtimestamp(project.timestamp).strftime('%Y-%m-%d %H:%M:%S') if project.timestamp else ''
+    return ExportDocument(
+        body=export_text,
+        title="자기소개서",
+        header_lines=(f"**지원 직무**: {project.job_title}", f"**작성일**: {written_at}"),
+        footer="AI 자기소개서 작성기로 생성됨",
+    )
+
+def build_project_data(project: CoverLetterProject) -> Dict:
+    """JSON 프로젝트 파일 내용"""
+    return {
+        "job_title": project.job_title,
+        "jd_text": project.jd_text,
+        "resume_text": project.resume_text,
+        "questions": project.questions,
+        "draft": project.draft,
+        "refined": project.refined,
+        "keywords": project.keywords,
+        "coverage": project.coverage,
+        "model": project.model,
+        "temperature": project.temperature,
+        "target_len": project.target_len,
+        "tone": project.tone,
+        "timestamp": project.timestamp,
+        "version": "2.0"
+    }
 
 def render_export():
-    """내보내기 기능"""
+    """내보내기 기능 (다운로드 요청 시에만 파일 생성)"""
     st.subheader("💾 5) 내보내기")
     
     project = st.session_state.project
@@ -582,64 +1052,50 @@ def render_export():
         st.info("내보낼 텍스트가 없습니다.")
         return
     
-    col1, col2, col3 = st.columns(3)
+    engine = get_export_engine()
+    doc = build_export_document(project, export_text)
     
+    col1, col2 = st.columns([2, 1])
     with col1:
-        # Markdown 다운로드
-        md_content = f"""# 자기소개서
-
-**지원 직무**: {project.job_title}
-**작성일**: {datetime.fromtimestamp(project.timestamp).strftime('%Y-%m-%d %H:%M:%S') if project.timestamp else ''}
-
-{export_text}
-
----
-*AI 자기소개서 작성기로 생성됨*
-"""
-        st.download_button(
-            "📄 Markdown 다운로드", 
-            data=md_content.encode("utf-8"), 
-            file_name=f"cover_letter_{int(time.time())}.md", 
-            mime="text/markdown",
-            use_container_width=True
+        fmt = st.selectbox(
+            "형식",
+            list(EXPORT_FORMATS.keys()),
+            format_func=lambda key: EXPORT_FORMATS[key][0],
+            key="export_format"
         )
-    
     with col2:
-        # JSON 프로젝트 파일
-        project_data = {
-            "job_title": project.job_title,
-            "jd_text": project.jd_text,
-            "resume_text": project.resume_text,
-            "questions": project.questions,
-            "draft": project.draft,
-            "refined": project.refined,
-            "keywords": project.keywords,
-            "coverage": project.coverage,
-            "model": project.model,
-            "temperature": project.temperature,
-            "target_len": project.target_len,
-            "tone": project.tone,
-            "timestamp": project.timestamp,
-            "version": "2.0"
-        }
-        
-        st.download_button(
-            "💾 프로젝트 저장", 
-            data=json.dumps(project_data, ensure_ascii=False, indent=2),
-            file_name=f"cover_letter_project_{int(time.time())}.json", 
-            mime="application/json",
-            use_container_width=True
-        )
+        st.write("")
+        if st.button("📦 파일 준비", use_container_width=True):
+            st.session_state.export_requested = fmt
     
-    with col3:
-        # 텍스트 파일
-        st.download_button(
-            "📝 텍스트 다운로드", 
-            data=export_text.encode("utf-8"), 
-            file_name=f"cover_letter_{int(time.time())}.txt", 
-            mime="text/plain",
-            use_container_width=True
-        )
+    # 준비 요청된 형식만 렌더링 (이후 재실행은 캐시 적중)
+    if st.session_state.get("export_requested") != fmt:
+        st.caption("형식을 선택하고 '파일 준비'를 누르면 다운로드 파일이 생성됩니다.")
+        return
+    
+    label, mime = EXPORT_FORMATS[fmt]
+    try:
+        # JSON/ZIP은 키워드·입력값까지 담기므로 문서가 아니라 프로젝트 JSON 내용으로 파일명을 정함
+        name_key = doc
+        if fmt == "json":
+            data = name_key = engine.render_json(build_project_data(project))
+        elif fmt == "zip":
+            name_key = engine.render_json(build_project_data(project))
+            data = engine.render_zip(doc, stem="cover_letter", extra={"cover_letter_project.json": name_key})
+        else:
+            data = engine.render(fmt, doc)
+    except Exception as e:
+        st.error(f"❌ 파일 생성 실패: {e}")
+        return
+    
+    stem = "cover_letter_project" if fmt == "json" else "cover_letter"
+    st.download_button(
+        f"{label} 다운로드",
+        data=data,
+        file_name=engine.file_name(stem, fmt, name_key),
+        mime=mime,
+        use_container_width=True
+    )
 
 def main():
     """메인 함수"""
@@ -656,17 +1112,19 @@ def main():
     
     # 세션 상태 초기화
     initialize_session_state()
+    resume_active_job()
     
     # 사이드바 설정
     show_analysis, auto_save = setup_sidebar()
     
     # 메인 컨텐츠
+    job_pending = False
     if render_input_form():
         # 생성 버튼
         generate_draft, refine_text, generate_all, analyze_keywords = render_generation_buttons()
         
         # 생성 프로세스
-        process_generation(generate_draft, refine_text, generate_all, analyze_keywords)
+        job_pending = process_generation(generate_draft, refine_text, generate_all, analyze_keywords)
         
         # 결과 표시
         render_results()
@@ -680,6 +1138,11 @@ def main():
     # 푸터
     st.markdown("---")
     st.caption("💡 **팁**: 구체적인 수치와 성과를 포함하면 더 좋은 자기소개서가 완성됩니다!")
+    
+    # 백그라운드 작업 진행 중이면 주기적으로 상태 갱신
+    if job_pending:
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
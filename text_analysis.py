@@ -0,0 +1,84 @@
+"""자기소개서 텍스트 분석 유틸리티 (글자 수, 가독성, 클리셰, 문항 분리)"""
+import re
+from typing import Dict, List, Tuple
+
+
+class TextAnalyzer:
+    @staticmethod
+    def count_korean_chars(text: str) -> int:
+        """한글 문자 수 계산"""
+        return len(re.sub(r'[^\uAC00-\uD7A3]', '', text))
+
+    @staticmethod
+    def analyze_readability(text: str) -> Dict:
+        """가독성 분석"""
+        sentences = re.split(r'[.!?]\s*', text)
+        sentences = [s.strip() for s in sentences if s.strip()]
+
+        if not sentences:
+            return {"avg_sentence_length": 0, "long_sentences": 0, "readability_score": 0}
+
+        sentence_lengths = [len(s) for s in sentences]
+        avg_length = sum(sentence_lengths) / len(sentence_lengths)
+        long_sentences = sum(1 for length in sentence_lengths if length > 100)
+
+        # 간단한 가독성 점수 (100점 만점)
+        readability_score = max(0, min(100, 100 - (avg_length - 50) * 2 - long_sentences * 10))
+
+        return {
+            "avg_sentence_length": round(avg_length, 1),
+            "long_sentences": long_sentences,
+            "readability_score": round(readability_score, 1),
+            "total_sentences": len(sentences)
+        }
+
+    @staticmethod
+    def detect_cliche_advanced(text: str) -> Dict:
+        """고도화된 클리셰 감지"""
+        cliche_patterns = {
+            "과도한 형용사": ["매우", "정말", "너무", "굉장히", "엄청", "최고의", "완벽한"],
+            "뻔한 표현": ["열정적으로", "끊임없이 노력", "항상 최선", "도전정신", "책임감", "소통능력"],
+            "추상적 표현": ["시너지", "윈윈", "파라다임", "벤치마킹", "글로벌 마인드"],
+            "과장 표현": ["혁신적인", "차별화된", "독창적인", "탁월한", "뛰어난"]
+        }
+
+        detected = {}
+        total_cliche = 0
+
+        for category, words in cliche_patterns.items():
+            found = []
+            for word in words:
+                count = text.count(word)
+                if count > 0:
+                    found.append(f"{word}({count})")
+                    total_cliche += count
+            detected[category] = found
+
+        return {
+            "categories": detected,
+            "total_cliche_count": total_cliche,
+            "cliche_density": round(total_cliche / max(1, len(text)) * 1000, 2)  # 1000자당 클리셰 수
+        }
+
+
+# ===== 문항 분리 =====
+SECTION_RE = re.compile(r'^\s*(?:#+\s*)?\*\*(.+?)\*\*\s*$', re.MULTILINE)
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """굵게 표시된 문항 제목 기준으로 (제목 줄, 본문) 분리. 제목이 없으면 전체를 한 섹션으로"""
+    matches = list(SECTION_RE.finditer(text))
+    if not matches:
+        return [("", text.strip())]
+    sections = []
+    preamble = text[:matches[0].start()].strip()
+    if preamble:
+        sections.append(("", preamble))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        sections.append((match.group(0).strip(), text[match.end():end].strip()))
+    return sections
+
+
+def join_sections(sections: List[Tuple[str, str]]) -> str:
+    return "\n\n".join(f"{header}\n{body}" if header else body for header, body in sections)
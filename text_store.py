@@ -0,0 +1,342 @@
+"""공유 텍스트 저장소와 세션 프로젝트 레코드
+
+같은 텍스트(공고, 이력서 등)는 내용 해시로 한 번만 보관하고, 프로젝트 레코드는 키만 들고 있습니다.
+유휴 세션의 텍스트는 디스크로 내보냈다가 다시 접근할 때 복원합니다.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+
+# ===== 공유 텍스트 저장소 =====
+TEXT_COMPRESS = os.getenv("COVERLETTER_TEXT_COMPRESS", "1") != "0"
+TEXT_COMPRESS_MIN = 2048  # 이 길이(바이트) 이상만 압축
+SESSION_IDLE_SECONDS = int(os.getenv("COVERLETTER_SESSION_IDLE", "1800"))
+SESSION_SPILL_DIR = os.getenv("COVERLETTER_SPILL_DIR", ".session_spill")
+SESSION_SWEEP_INTERVAL = 60
+SESSION_SPILL_RETENTION = int(os.getenv("COVERLETTER_SPILL_RETENTION", "86400"))  # 이관 파일 최대 보관 시간(초)
+
+
+class TextStore:
+    """내용 주소(해시) 기반 공유 텍스트 저장소. 같은 텍스트는 프로세스에 한 번만 보관 (참조 카운트)"""
+    def __init__(self, compress: bool = TEXT_COMPRESS, compress_min: int = TEXT_COMPRESS_MIN):
+        self.compress = compress
+        self.compress_min = compress_min
+        self._lock = threading.Lock()
+        self._entries: Dict[str, list] = {}  # key → [데이터(str|압축 bytes), 참조 수, 원본 바이트 수]
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def put(self, text: str) -> str:
+        key = self.make_key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                entry[1] += 1
+                return key
+        raw = text.encode("utf-8")
+        data = zlib.compress(raw, 6) if self.compress and len(raw) >= self.compress_min else sys.intern(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                entry[1] += 1
+            else:
+                self._entries[key] = [data, 1, len(raw)]
+        return key
+
+    def get(self, key: str) -> str:
+        with self._lock:
+            data = self._entries[key][0]
+        return zlib.decompress(data).decode("utf-8") if isinstance(data, bytes) else data
+
+    def retain(self, key: str) -> None:
+        with self._lock:
+            self._entries[key][1] += 1
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._entries[key]
+
+    def footprint(self, key: str) -> Tuple[int, int, int]:
+        """(저장 바이트, 원본 바이트, 참조 수)"""
+        with self._lock:
+            data, refs, raw_size = self._entries[key]
+        return sys.getsizeof(data), raw_size, refs
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "entries": len(entries),
+            "refs": sum(e[1] for e in entries),
+            "raw_bytes": sum(e[2] for e in entries),
+            "stored_bytes": sum(sys.getsizeof(e[0]) for e in entries),
+        }
+
+
+# ===== 데이터 구조 =====
+class _StoredText:
+    """긴 텍스트 필드: 레코드에는 저장소 키만 두고 값은 TextStore에서 읽음"""
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return obj._get_text(self.name)
+
+    def __set__(self, obj, value):
+        obj._set_text(self.name, value)
+
+
+class CoverLetterProject:
+    """자기소개서 프로젝트 (slots 기반 경량 레코드, 유휴 시 디스크로 내보낼 수 있음)"""
+    TEXT_FIELDS = ("jd_text", "resume_text", "draft", "refined")
+    __slots__ = ("job_title", "questions", "keywords", "coverage", "model", "temperature",
+                 "target_len", "tone", "timestamp", "_store", "_text_keys", "_spill_path", "__weakref__")
+    _spill_lock = threading.Lock()
+
+    jd_text = _StoredText()
+    resume_text = _StoredText()
+    draft = _StoredText()
+    refined = _StoredText()
+
+    def __init__(self, job_title: str, jd_text: str, resume_text: str, questions: str,
+                 draft: Optional[str] = None, refined: Optional[str] = None,
+                 keywords: Optional[List[str]] = None, coverage: Optional[Dict] = None,
+                 model: str = "gpt-4o-mini", temperature: float = 0.7, target_len: int = 800,
+                 tone: str = "정중하고 간결한", timestamp: float = 0.0, store: Optional[TextStore] = None):
+        self._store = store or get_default_store()
+        self._text_keys: Dict[str, str] = {}
+        self._spill_path: Optional[str] = None
+        self.job_title = job_title
+        self.jd_text = jd_text
+        self.resume_text = resume_text
+        self.questions = questions
+        self.draft = draft
+        self.refined = refined
+        self.keywords = keywords
+        self.coverage = coverage
+        self.model = model
+        self.temperature = temperature
+        self.target_len = target_len
+        self.tone = tone
+        self.timestamp = timestamp
+
+    def __del__(self):
+        try:
+            for key in self._text_keys.values():
+                self._store.release(key)
+            self._text_keys = {}
+            # 이관 파일에는 개인정보가 들어 있으므로 프로젝트와 함께 삭제
+            if self._spill_path:
+                os.remove(self._spill_path)
+                self._spill_path = None
+        except Exception:
+            pass
+
+    def _get_text(self, name: str) -> Optional[str]:
+        if self._spill_path:
+            self.restore()
+        key = self._text_keys.get(name)
+        return self._store.get(key) if key else None
+
+    def _set_text(self, name: str, value: Optional[str]) -> None:
+        if self._spill_path:
+            self.restore()
+        old_key = self._text_keys.pop(name, None)
+        if value is not None:
+            self._text_keys[name] = self._store.put(value)
+        if old_key:
+            self._store.release(old_key)
+
+    def copy(self) -> "CoverLetterProject":
+        """작업 스냅샷용 복사 (텍스트는 저장소에서 공유)"""
+        clone = CoverLetterProject.__new__(CoverLetterProject)
+        for name in self.__slots__:
+            if name != "__weakref__" and name != "_text_keys":
+                setattr(clone, name, getattr(self, name))
+        if self._spill_path:
+            self.restore()
+        clone._spill_path = None
+        clone._text_keys = dict(self._text_keys)
+        for key in clone._text_keys.values():
+            self._store.retain(key)
+        return clone
+
+    def spill(self, path: str) -> None:
+        """긴 텍스트를 디스크로 내보내고 저장소 참조 해제"""
+        with self._spill_lock:
+            if self._spill_path:
+                return
+            texts = {name: self._store.get(key) for name, key in self._text_keys.items()}
+            with open(path, "wb") as f:
+                f.write(zlib.compress(json.dumps(texts, ensure_ascii=False).encode("utf-8")))
+            for key in self._text_keys.values():
+                self._store.release(key)
+            self._text_keys = {}
+            self._spill_path = path
+
+    def restore(self) -> None:
+        """디스크로 내보낸 텍스트를 다시 불러옴"""
+        with self._spill_lock:
+            path = self._spill_path
+            if not path:
+                return
+            with open(path, "rb") as f:
+                texts = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+            self._text_keys = {name: self._store.put(text) for name, text in texts.items()}
+            self._spill_path = None
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def discard_spill(self) -> None:
+        """보관 기한이 지난 이관 파일 삭제 (이관된 텍스트는 복구되지 않음)"""
+        with self._spill_lock:
+            path = self._spill_path
+            self._spill_path = None
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def memory_report(self) -> Dict:
+        """레코드 자체 크기 + 공유 텍스트의 지분(저장 크기 / 참조 수)"""
+        record_bytes = sys.getsizeof(self) + sys.getsizeof(self._text_keys)
+        for name in ("job_title", "questions", "keywords", "coverage", "model", "tone"):
+            record_bytes += sys.getsizeof(getattr(self, name))
+        record_bytes += sum(sys.getsizeof(k) for k in self.keywords or [])
+        shared_bytes = 0.0
+        raw_bytes = 0
+        for key in self._text_keys.values():
+            stored, raw, refs = self._store.footprint(key)
+            shared_bytes += stored / max(1, refs)
+            raw_bytes += raw
+        return {
+            "record_bytes": record_bytes,
+            "shared_text_bytes": int(shared_bytes),
+            "raw_text_bytes": raw_bytes,
+            "total_bytes": record_bytes + int(shared_bytes),
+            "spilled": bool(self._spill_path),
+        }
+
+
+class SessionRegistry:
+    """세션별 프로젝트 추적 및 유휴 세션 디스크 이관 (프로세스 공유)"""
+    def __init__(self, idle_seconds: int = SESSION_IDLE_SECONDS, spill_dir: str = SESSION_SPILL_DIR,
+                 retention_seconds: int = SESSION_SPILL_RETENTION):
+        self.idle_seconds = idle_seconds
+        self.spill_dir = spill_dir
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Tuple["weakref.ref", float]] = {}
+        self._spilled: Dict[str, "weakref.ref"] = {}  # 이관된 세션 → 프로젝트 (파일 정리용)
+        self._last_sweep = 0.0
+        self.evicted = 0
+        self.purged = 0
+
+    def _spill_file(self, session_id: str) -> str:
+        return os.path.join(self.spill_dir, f"{session_id}.json.z")
+
+    def touch(self, session_id: str, project: CoverLetterProject) -> None:
+        with self._lock:
+            self._sessions[session_id] = (weakref.ref(project), time.time())
+            self._spilled.pop(session_id, None)
+
+    def sweep(self) -> int:
+        """유휴 세션의 텍스트를 디스크로 이관하고 남은 이관 파일을 정리. 이관한 세션 수 반환"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < SESSION_SWEEP_INTERVAL:
+                return 0
+            self._last_sweep = now
+            idle = [(sid, ref) for sid, (ref, seen) in self._sessions.items() if now - seen > self.idle_seconds]
+            for sid, _ in idle:
+                del self._sessions[sid]
+            # 종료된 세션(프로젝트가 이미 해제됨) 정리
+            for sid in [sid for sid, (ref, _) in self._sessions.items() if ref() is None]:
+                del self._sessions[sid]
+            dead = [sid for sid, ref in self._spilled.items() if ref() is None]
+            for sid in dead:
+                del self._spilled[sid]
+
+        count = 0
+        for sid, ref in idle:
+            project = ref()
+            if project is None:
+                continue
+            os.makedirs(self.spill_dir, exist_ok=True)
+            project.spill(self._spill_file(sid))
+            with self._lock:
+                self._spilled[sid] = ref
+            count += 1
+        self.evicted += count
+        self.purged += self._purge_spill_files(dead, now)
+        return count
+
+    def _purge_spill_files(self, dead: List[str], now: float) -> int:
+        """종료된 세션의 이관 파일과 보관 기한이 지난 이관 파일 삭제 (개인정보 포함)"""
+        removed = 0
+        for sid in dead:
+            try:
+                os.remove(self._spill_file(sid))
+                removed += 1
+            except OSError:
+                pass
+        try:
+            entries = list(os.scandir(self.spill_dir))
+        except OSError:
+            return removed
+        for entry in entries:
+            if not entry.name.endswith(".json.z"):
+                continue
+            try:
+                if now - entry.stat().st_mtime <= self.retention_seconds:
+                    continue
+            except OSError:
+                continue
+            sid = entry.name[:-len(".json.z")]
+            with self._lock:
+                ref = self._spilled.pop(sid, None)
+            project = ref() if ref else None
+            if project is not None:
+                project.discard_spill()
+            else:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+            removed += 1
+        return removed
+
+    def active_sessions(self) -> int:
+        with self._lock:
+            return sum(1 for ref, _ in self._sessions.values() if ref() is not None)
+
+
+_default_store: Optional[TextStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store() -> TextStore:
+    """프로세스 공유 기본 저장소"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = TextStore()
+    return _default_store